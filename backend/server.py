@@ -1,19 +1,29 @@
-from fastapi import FastAPI, APIRouter, HTTPException, BackgroundTasks
+from fastapi import FastAPI, APIRouter, HTTPException, BackgroundTasks, Query
 from fastapi.responses import StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
 import pandas as pd
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+from dataclasses import dataclass
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import random
 import platform
 import io
+import json
 import logging
 import time
 import re
 import os
 import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+import hashlib
+import shutil
+import requests
+import httpx
+from urllib.parse import urljoin
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -22,8 +32,25 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
-from collections import defaultdict
+from bs4 import BeautifulSoup, SoupStrainer
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as SelectolaxParser
+    except ImportError:
+        SelectolaxParser = None
+from collections import defaultdict, deque
+from operator import attrgetter
+from functools import lru_cache
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
 
 app = FastAPI(title="小八爬虫管理系统", description="师门登录优化版 v2.5 - 自动化增强版")
 api_router = APIRouter(prefix="/api")
@@ -39,6 +66,12 @@ keyword_stats = defaultdict(int)
 crawl_history = []
 auto_crawl_running = False
 accumulated_data = {}
+session_monitor_urls = {}  # 账号登录成功后的监控页URL，用于会话复用
+row_hashes = {}  # (账号, 序号, IP) -> 上次原始单元格的哈希，用于跳过未变化的行
+memory_index = {}  # (账号, 序号, IP) -> memory_data中的位置
+page_fingerprints = {}  # 账号 -> 上个周期监控页/数据行的指纹，用于整页无变化时直接跳过
+http_sessions = {}  # HTTP引擎每个账号保持的会话（含cookie）
+async_http_clients = {}  # 异步HTTP引擎每个账号保持的客户端（含cookie）
 
 # 默认关键词监控列表
 DEFAULT_MONITOR_KEYWORDS = [
@@ -49,6 +82,484 @@ DEFAULT_MONITOR_KEYWORDS = [
 # 动态关键词监控列表（可以增删）
 MONITOR_KEYWORDS = DEFAULT_MONITOR_KEYWORDS.copy()
 
+# 关键词模式 - 以"re:"开头的按正则匹配，以"glob:"开头的按通配符（*和?）匹配，其余均为普通子串
+KEYWORD_PATTERN_PREFIXES = {"re:": "regex", "glob:": "wildcard"}
+KEYWORD_PATTERN_MAX_LENGTH = 100
+# 模式关键词只匹配状态文本的前段，无上限重复按这一长度估算回溯次数
+KEYWORD_PATTERN_MAX_TEXT = 256
+# 每个起始位置允许的最大回溯估算值：一个无上限重复（256）加少量有界重复，两个无上限重复即超出
+KEYWORD_PATTERN_MAX_COST = 4096
+
+def keyword_kind(keyword):
+    for prefix, kind in KEYWORD_PATTERN_PREFIXES.items():
+        if keyword.startswith(prefix):
+            return kind
+    return "literal"
+
+def wildcard_to_regex(body):
+    """通配符转正则：连续的*和?合并为一个重复；子串搜索不锚定首尾，首尾的*没有意义直接去掉"""
+    runs = [run for run in re.split(r"([*?]+)", body) if run]
+    parts = []
+    for index, run in enumerate(runs):
+        if run[0] not in "*?":
+            parts.append(re.escape(run))
+            continue
+        fixed = run.count("?")
+        unbounded = "*" in run and 0 < index < len(runs) - 1
+        if unbounded:
+            parts.append(f".{{{fixed},}}" if fixed else ".*")
+        elif fixed:
+            parts.append("." if fixed == 1 else f".{{{fixed}}}")
+    return "".join(parts)
+
+def regex_backtracking_cost(parsed):
+    """估算正则在每个起始位置最多尝试的匹配路径数：序列相乘、分支相加，
+    无上限重复按KEYWORD_PATTERN_MAX_TEXT计，重复的内容本身有多种走法时按指数计（嵌套无上限重复为无穷）"""
+    cost = 1
+    for op, av in parsed:
+        if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, "POSSESSIVE_REPEAT", None)):
+            low, high, body = av
+            inner = regex_backtracking_cost(body)
+            if high == sre_parse.MAXREPEAT:
+                item = KEYWORD_PATTERN_MAX_TEXT if inner == 1 else float("inf")
+            elif inner == 1:
+                item = high - low + 1
+            else:
+                item = float("inf") if high > 32 else (inner + 1) ** high
+        elif op in (sre_parse.SUBPATTERN, getattr(sre_parse, "ATOMIC_GROUP", None)):
+            item = regex_backtracking_cost(av[-1] if op == sre_parse.SUBPATTERN else av)
+        elif op == sre_parse.BRANCH:
+            item = sum(regex_backtracking_cost(branch) for branch in av[1])
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            item = regex_backtracking_cost(av[1])
+        elif op in (sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS):
+            raise ValueError("不支持反向引用")
+        else:
+            item = 1
+        cost *= item
+        if cost > KEYWORD_PATTERN_MAX_COST:
+            return cost
+    return cost
+
+@lru_cache(maxsize=256)
+def compile_keyword_pattern(keyword):
+    """把正则/通配符关键词编译为正则，普通关键词返回None；不安全或无效的模式抛出ValueError"""
+    kind = keyword_kind(keyword)
+    if kind == "literal":
+        return None
+    if len(keyword) > KEYWORD_PATTERN_MAX_LENGTH:
+        raise ValueError(f"模式关键词过长（最多{KEYWORD_PATTERN_MAX_LENGTH}个字符）")
+    
+    body = keyword.split(":", 1)[1]
+    source = wildcard_to_regex(body) if kind == "wildcard" else body
+    if not source:
+        raise ValueError("模式关键词不能为空")
+    try:
+        pattern = re.compile(source)
+        parsed = sre_parse.parse(source)
+    except re.error as e:
+        raise ValueError(f"无效的正则表达式: {e}")
+    if regex_backtracking_cost(parsed) > KEYWORD_PATTERN_MAX_COST:
+        raise ValueError("模式可能导致灾难性回溯：最多包含一个无上限重复（*、+、{n,}），"
+                         "有界重复的范围和嵌套也需尽量小")
+    # 所有模式会合并成一个交替正则，全局内联标志和命名分组在合并后会出错或冲突
+    if pattern.flags != re.compile("").flags:
+        raise ValueError("不支持全局内联标志（如(?i)），请改用局部形式(?i:...)")
+    if pattern.groupindex:
+        raise ValueError("不支持命名分组，请改用(?:...)")
+    if pattern.search(""):
+        raise ValueError("模式关键词不能匹配空文本")
+    return pattern
+
+def keyword_predicate(keyword):
+    """返回判断文本是否命中该关键词的函数"""
+    pattern = compile_keyword_pattern(keyword)
+    if pattern is None:
+        return lambda text: keyword in text
+    # 与KeywordMatcher一致，模式关键词只匹配文本前段
+    return lambda text: pattern.search(text[:KEYWORD_PATTERN_MAX_TEXT]) is not None
+
+# 关键词匹配器 - 普通关键词用Aho-Corasick自动机一次扫描，模式关键词合并为一个正则预筛
+class KeywordMatcher:
+    def __init__(self, keywords):
+        self.keywords = tuple(keywords)
+        self.patterns = []
+        self.rejected = {}  # 无法使用的模式关键词 -> 原因
+        goto = [{}]
+        output = [()]
+        for keyword in self.keywords:
+            if not keyword:
+                continue
+            try:
+                pattern = compile_keyword_pattern(keyword)
+            except ValueError as e:
+                logger.error(f"忽略无效的模式关键词: {keyword} - {str(e)}")
+                self.rejected[keyword] = str(e)
+                continue
+            if pattern is not None:
+                self.patterns.append((keyword, pattern))
+                continue
+            node = 0
+            for ch in keyword:
+                next_node = goto[node].get(ch)
+                if next_node is None:
+                    goto.append({})
+                    output.append(())
+                    next_node = len(goto) - 1
+                    goto[node][ch] = next_node
+                node = next_node
+            output[node] = output[node] + (keyword,)
+        
+        # 按层构建失配指针，并把后缀节点的输出合并进来
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, next_node in goto[node].items():
+                queue.append(next_node)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[next_node] = goto[f].get(ch, 0)
+                output[next_node] = output[next_node] + output[fail[next_node]]
+        
+        self.goto = goto
+        self.fail = fail
+        self.output = output
+        self.has_literals = len(goto) > 1
+        # 普通关键词和模式关键词合成一个交替正则作为快速预筛，绝大多数不含关键词的状态文本在C层直接排除
+        literals = sorted({k for k in self.keywords if k and keyword_kind(k) == "literal"}, key=len, reverse=True)
+        try:
+            self.prefilter = self.compile_prefilter(literals, self.patterns)
+        except re.error as e:
+            # 单独合法但合并后出错的模式逐个排除，保证匹配器总能建成
+            logger.error(f"模式关键词合并失败，逐个排除: {str(e)}")
+            usable = []
+            for keyword, pattern in self.patterns:
+                try:
+                    self.compile_prefilter(literals, usable + [(keyword, pattern)])
+                    usable.append((keyword, pattern))
+                except re.error as e:
+                    logger.error(f"忽略无法合并的模式关键词: {keyword} - {str(e)}")
+                    self.rejected[keyword] = f"无法与其他关键词合并匹配: {e}"
+            self.patterns = usable
+            self.prefilter = self.compile_prefilter(literals, usable)
+
+    @staticmethod
+    def compile_prefilter(literals, patterns):
+        alternatives = [re.escape(k) for k in literals] + [f"(?:{pattern.pattern})" for _, pattern in patterns]
+        return re.compile("|".join(alternatives)) if alternatives else None
+
+    def find(self, text):
+        """返回文本中命中的全部关键词（去重，普通关键词按出现顺序，其后为模式关键词）"""
+        if self.prefilter is None:
+            return []
+        if len(text) <= KEYWORD_PATTERN_MAX_TEXT:
+            if not self.prefilter.search(text):
+                return []
+            pattern_text = text
+        else:
+            # 超长文本不走合并预筛；模式关键词只匹配前段，回溯耗时有上限
+            pattern_text = text[:KEYWORD_PATTERN_MAX_TEXT]
+        found = []
+        if self.has_literals:
+            goto, fail, output = self.goto, self.fail, self.output
+            node = 0
+            for ch in text:
+                while node and ch not in goto[node]:
+                    node = fail[node]
+                node = goto[node].get(ch, 0)
+                for keyword in output[node]:
+                    if keyword not in found:
+                        found.append(keyword)
+        for keyword, pattern in self.patterns:
+            if pattern.search(pattern_text):
+                found.append(keyword)
+        return found
+
+@lru_cache(maxsize=8)
+def compile_keyword_matcher(keywords):
+    """按关键词列表（元组即版本）缓存匹配器，列表恢复成用过的版本时直接复用"""
+    return KeywordMatcher(keywords)
+
+keyword_matcher = compile_keyword_matcher(tuple(MONITOR_KEYWORDS))
+
+def rebuild_keyword_matcher():
+    """关键词列表变化后切换匹配器，整体替换引用，爬虫线程不会看到构建到一半的状态"""
+    global keyword_matcher
+    try:
+        keyword_matcher = compile_keyword_matcher(tuple(MONITOR_KEYWORDS))
+    except re.error as e:
+        # 兜底：模式关键词出错时只按普通关键词匹配，不让匹配器停留在旧列表上
+        logger.error(f"关键词匹配器构建失败，仅使用普通关键词: {str(e)}")
+        keyword_matcher = KeywordMatcher([k for k in MONITOR_KEYWORDS if keyword_kind(k) == "literal"])
+
+def validate_new_keyword(keyword, keywords):
+    """校验待添加的关键词：模式关键词需单独合法，且与现有列表合并后仍能建成匹配器"""
+    if compile_keyword_pattern(keyword) is None:
+        return
+    matcher = compile_keyword_matcher(tuple(keywords) + (keyword,))
+    if keyword in matcher.rejected:
+        raise ValueError(matcher.rejected[keyword])
+
+# 关键词命中滑动窗口统计 - 按(关键词, 账号, 序号)分别计数
+KEYWORD_HIT_WINDOWS = {"1m": 60, "15m": 900, "1h": 3600}
+KEYWORD_HIT_BUCKET_SECONDS = 10
+
+class KeywordHitWindows:
+    """每个键一个定长环形缓冲区（10秒一格，覆盖最长窗口），并为每个窗口维护滚动合计。
+    记录命中和推进时间都只改动固定数量的格子，查询直接读合计，不扫描历史。"""
+    
+    def __init__(self, windows=KEYWORD_HIT_WINDOWS, bucket_seconds=KEYWORD_HIT_BUCKET_SECONDS):
+        self.bucket_seconds = bucket_seconds
+        self.window_buckets = {name: max(1, seconds // bucket_seconds) for name, seconds in windows.items()}
+        self.size = max(self.window_buckets.values())
+        self.series = {}  # (关键词, 账号, 序号) -> [当前格编号, 环形计数, {窗口: 合计}]
+        self.lock = threading.Lock()
+    
+    def _bucket(self, now=None):
+        return int((now if now is not None else time.time()) // self.bucket_seconds)
+    
+    def _advance(self, entry, bucket):
+        """把键推进到bucket所在格：移出各窗口的格子从合计中减掉，复用的格子清零"""
+        current, counts, sums = entry
+        steps = bucket - current
+        if steps <= 0:
+            return
+        if steps >= self.size:
+            counts[:] = [0] * self.size
+            for name in sums:
+                sums[name] = 0
+        else:
+            size = self.size
+            for b in range(current + 1, bucket + 1):
+                for name, length in self.window_buckets.items():
+                    sums[name] -= counts[(b - length) % size]
+                counts[b % size] = 0
+        entry[0] = bucket
+    
+    def record(self, keyword, username, sequence_number, now=None):
+        bucket = self._bucket(now)
+        key = (keyword, username, sequence_number)
+        with self.lock:
+            entry = self.series.get(key)
+            if entry is None:
+                entry = [bucket, [0] * self.size, dict.fromkeys(self.window_buckets, 0)]
+                self.series[key] = entry
+            else:
+                self._advance(entry, bucket)
+            # 补录的历史命中可能落在当前格之前，只计入仍覆盖该格的窗口
+            age = entry[0] - bucket
+            if age >= self.size:
+                return
+            entry[1][bucket % self.size] += 1
+            for name, length in self.window_buckets.items():
+                if age < length:
+                    entry[2][name] += 1
+    
+    def query(self, keyword=None, username=None, now=None):
+        """返回各窗口内的命中，顺便丢弃最长窗口内已无命中的键"""
+        bucket = self._bucket(now)
+        results = []
+        with self.lock:
+            for key, entry in list(self.series.items()):
+                self._advance(entry, bucket)
+                if not any(entry[2].values()):
+                    del self.series[key]
+                    continue
+                if (keyword is not None and key[0] != keyword) or (username is not None and key[1] != username):
+                    continue
+                results.append((key, dict(entry[2])))
+        return results
+    
+    def discard_keyword(self, keyword):
+        with self.lock:
+            for key in [k for k in self.series if k[0] == keyword]:
+                del self.series[key]
+    
+    def clear(self):
+        with self.lock:
+            self.series.clear()
+
+keyword_hit_windows = KeywordHitWindows()
+
+# 关键词状态跟踪 - 只在角色进入关键词状态时计数，并记录停留时长
+keyword_states = {}  # (账号, 序号) -> {"text": 上次状态文本, "matcher": 扫描时的自动机, "keywords": {关键词: 进入时间}}
+# 爬虫线程、回溯补录线程和事件循环都会改动keyword_states：改动须持有此锁，
+# 且每个角色的状态字典只整体替换、不原地修改，拿到引用后可在锁外安全读取
+keyword_state_lock = threading.Lock()
+keyword_durations = {}  # 关键词 -> 已结束状态的停留时长汇总
+keyword_duration_lock = threading.Lock()
+
+def record_keyword_duration(keyword, seconds):
+    """累计一次已结束的关键词状态停留时长"""
+    with keyword_duration_lock:
+        stats = keyword_durations.setdefault(keyword, {"episodes": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+        stats["episodes"] += 1
+        stats["total_seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+def close_keyword_states(username, keep_sequence_numbers=()):
+    """结束账号下已不在监控页上的角色的关键词状态，已停留时长计入汇总"""
+    now = time.time()
+    with keyword_state_lock:
+        closed = [keyword_states.pop(k) for k in list(keyword_states)
+                  if k[0] == username and k[1] not in keep_sequence_numbers]
+    for state in closed:
+        for keyword, entered_at in state["keywords"].items():
+            record_keyword_duration(keyword, now - entered_at)
+
+def prune_keyword_states(keep_usernames):
+    """结束已删除或不再活跃账号的全部关键词状态"""
+    with keyword_state_lock:
+        usernames = {k[0] for k in keyword_states}
+    for username in usernames - set(keep_usernames):
+        close_keyword_states(username)
+
+# 关键词告警推送（SSE）- 每个客户端一个有界队列，满了丢弃最旧的告警
+KEYWORD_ALERT_QUEUE_SIZE = 100
+KEYWORD_ALERT_MAX_QUEUE_SIZE = 1000
+KEYWORD_ALERT_HEARTBEAT_SECONDS = 15
+
+class KeywordAlertSubscriber:
+    """单个SSE客户端：过滤条件、有界队列和唤醒事件都属于客户端所在的事件循环"""
+    
+    def __init__(self, loop, keywords=None, accounts=None, queue_size=KEYWORD_ALERT_QUEUE_SIZE):
+        self.loop = loop
+        self.keywords = set(keywords) if keywords else None
+        self.accounts = set(accounts) if accounts else None
+        self.queue = deque(maxlen=queue_size)
+        self.ready = asyncio.Event()
+        self.dropped = 0
+    
+    def wants(self, alert):
+        return ((self.keywords is None or alert["keyword"] in self.keywords) and
+                (self.accounts is None or alert["account_username"] in self.accounts))
+    
+    def push(self, alert):
+        """在事件循环线程中执行；队列已满时deque自动挤掉最旧的一条"""
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append(alert)
+        self.ready.set()
+
+class KeywordAlertBroker:
+    def __init__(self):
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.next_id = 0
+    
+    def subscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.add(subscriber)
+    
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+    
+    def publish(self, keyword, username, sequence_number, text):
+        """由爬虫线程调用：按客户端的过滤条件分发，投递交给各自的事件循环，不在这里等待"""
+        with self.lock:
+            if not self.subscribers:
+                return
+            self.next_id += 1
+            subscribers = list(self.subscribers)
+            alert = {
+                "id": self.next_id,
+                "account_username": username,
+                "sequence_number": sequence_number,
+                "keyword": keyword,
+                "status_text": text,
+                "timestamp": datetime.utcnow().isoformat()
+            }
+        
+        for subscriber in subscribers:
+            if not subscriber.wants(alert):
+                continue
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.push, alert)
+            except RuntimeError:
+                # 事件循环已关闭，客户端不会再读取
+                self.unsubscribe(subscriber)
+
+keyword_alert_broker = KeywordAlertBroker()
+
+# 轻量爬取配置 - 通过CDP屏蔽的非必要资源
+BLOCKED_RESOURCE_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.css", "*.mp3", "*.mp4", "*.webm"
+]
+
+# 轻量爬取配置 - 关闭不需要的Chromium子系统
+LIGHTWEIGHT_CHROME_ARGS = [
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-translate",
+    "--disable-client-side-phishing-detection",
+    "--disable-features=Translate,MediaRouter,OptimizationHints",
+    "--blink-settings=imagesEnabled=false",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--no-first-run"
+]
+
+# 页面内提取表格数据行，返回{header: [表头文本...], rows: [[序号, [单元格文本...]], ...]}
+# 单元格文本按BeautifulSoup的get_text(strip=True)规则拼接：逐个文本节点去空白后直接连接
+# 传入表头特征时只提取首个表头匹配的监控表，未匹配时提取全部表格
+TABLE_ROWS_SCRIPT = """
+const signature = arguments[0];
+const cellText = (cell) => {
+    const walker = document.createTreeWalker(cell, NodeFilter.SHOW_TEXT);
+    let text = '';
+    while (walker.nextNode()) { text += walker.currentNode.nodeValue.trim(); }
+    return text;
+};
+let tables = Array.from(document.querySelectorAll('table'));
+let header = null;
+if (signature) {
+    for (const table of tables) {
+        const first = table.querySelector('tr');
+        const texts = first ? Array.from(first.querySelectorAll('td, th'), cellText) : [];
+        if (texts.length >= 8 && signature.every((word) => texts.some((h) => h.includes(word)))) {
+            tables = [table];
+            header = texts;
+            break;
+        }
+    }
+}
+const result = [];
+for (const table of tables) {
+    const rows = table.querySelectorAll('tr');
+    for (let i = 1; i < rows.length; i++) {
+        const cells = rows[i].querySelectorAll('td, th');
+        if (cells.length >= 8) {
+            result.push([i, Array.from(cells, cellText)]);
+        }
+    }
+}
+return {header: header, rows: result};
+"""
+
+# 登录失败提示的探测XPath - 在浏览器内匹配，只返回命中的元素
+LOGIN_ERROR_XPATH = "//*[contains(text(), '用户名或密码') or contains(text(), '错误') or contains(text(), '失败')]"
+
+# 登录页探测 - HTTP引擎直接在响应文本里找密码输入框，不构建解析树
+LOGIN_PASSWORD_INPUT = re.compile(r"""<input\b[^>]*\bname\s*=\s*["']?Password\b""", re.IGNORECASE)
+
+# 页面传输字节数与加载耗时（Navigation/Resource Timing）
+PAGE_METRICS_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+let transfer = nav ? nav.transferSize : 0;
+for (const r of resources) { transfer += r.transferSize || 0; }
+const loadMs = nav ? (nav.loadEventEnd || nav.domContentLoadedEventEnd) : performance.now();
+return {transfer_bytes: transfer, resource_count: resources.length, load_ms: Math.round(loadMs)};
+"""
+
 class CrawlerAccount(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     username: str
@@ -93,6 +604,39 @@ class CrawlerData(BaseModel):
     accumulated_count: int = 0
     cycle_count: int = 0
 
+# 内部存储用的紧凑数据行 - 接口返回时再转换为CrawlerData的字典结构
+@dataclass(slots=True)
+class GuildRow:
+    id: str
+    account_username: str
+    sequence_number: int
+    ip: str
+    type: str
+    name: str
+    level: int
+    guild: str
+    skill: str
+    count_current: int
+    count_total: int
+    total_time: str
+    status: str
+    runtime: str
+    crawl_timestamp: datetime
+    accumulated_count: int = 0
+    cycle_count: int = 0
+    # 入库时解析好的数值字段，筛选、排序和统计直接使用；原字符串只用于展示
+    runtime_seconds: int = 0
+    total_time_current: int = 0
+    total_time_total: int = 0
+    crawl_timestamp_ms: int = 0
+
+    def to_dict(self):
+        """转换为接口返回的字典结构"""
+        return {field: getattr(self, field) for field in GUILD_ROW_FIELDS}
+
+GUILD_ROW_FIELDS = GuildRow.__slots__
+GUILD_ROWS_ADAPTER = TypeAdapter(List[GuildRow])
+
 class CrawlerConfig(BaseModel):
     target_url: str = "http://xiao8.lodsve.com:6007/x8login"
     crawl_interval: int = 45
@@ -101,6 +645,20 @@ class CrawlerConfig(BaseModel):
     auto_crawl_enabled: bool = False
     max_concurrent_crawlers: int = 10
     max_active_accounts: int = 10
+    crawl_engine: str = "selenium"  # selenium: 浏览器爬取, http: 无浏览器HTTP爬取, async_http: 事件循环内异步HTTP爬取
+    lightweight_profile: bool = True  # 屏蔽图片/字体/样式并使用eager加载策略
+    html_parser: str = "lxml"  # 监控页HTML解析器: html.parser, lxml, selectolax（未安装时回退到html.parser）
+    table_mode: str = "monitor"  # monitor: 只解析按表头定位的监控表, all: 解析页面所有表格
+    parse_in_process_pool: bool = False  # 在进程池中解析监控页HTML，避免与接口和其他爬虫争用GIL
+    parse_pool_workers: int = 0  # 解析进程数，0表示使用os.cpu_count()
+    extraction_mode: str = "script"  # script: 页面内脚本提取表格, page_source: 整页源码解析
+    browser_mode: str = "per_account"  # per_account: 每个账号一个浏览器, shared: 共享浏览器+独立上下文
+    shared_browser_count: int = 3  # shared模式的共享浏览器数量，同一浏览器内的账号串行，不同浏览器之间并行
+    driver_pool_enabled: bool = True  # 跨周期复用每个账号的浏览器
+    driver_max_age: int = 1800  # 驱动最长存活秒数，超过则回收重建
+    driver_max_uses: int = 100  # 驱动最多复用次数，超过则回收重建
+    driver_max_memory_mb: int = 600  # 驱动进程树内存上限(MB)，超过则回收重建
+    memory_watchdog_interval: int = 30  # 内存巡检间隔秒数
 
 class KeywordRequest(BaseModel):
     keyword: str
@@ -118,314 +676,1806 @@ class FilterRequest(BaseModel):
     start_date: Optional[str] = None
     end_date: Optional[str] = None
     keyword: Optional[str] = None
+    min_runtime_seconds: Optional[int] = None
+    max_runtime_seconds: Optional[int] = None
+    sort_by: Optional[str] = None  # level, count_current, accumulated_count, runtime_seconds, total_time_current, crawl_timestamp_ms
+    sort_desc: bool = False
 
 class BatchOperationRequest(BaseModel):
     account_ids: List[str]
     operation: str  # start, stop, pause, resume, delete
 
-# 优化的师门登录爬虫类
-class OptimizedGuildCrawler:
+# 浏览器与驱动路径 - 进程启动时解析一次，爬取时直接使用
+CHROME_BINARY_CANDIDATES = ["/usr/bin/chromium", "/usr/bin/chromium-browser", "/usr/bin/google-chrome"]
+CHROMEDRIVER_CANDIDATES = ["/usr/bin/chromedriver", "/usr/lib/chromium/chromedriver"]
+
+chrome_runtime = {}
+chrome_runtime_lock = threading.Lock()
+
+def resolve_chrome_runtime():
+    """解析Chromium和chromedriver路径并缓存到进程级缓存"""
+    with chrome_runtime_lock:
+        if chrome_runtime:
+            return chrome_runtime
+        
+        binary_path = next((p for p in CHROME_BINARY_CANDIDATES if os.path.exists(p)), None)
+        binary_path = binary_path or shutil.which("chromium") or shutil.which("google-chrome")
+        
+        driver_source = "system"
+        driver_path = next((p for p in CHROMEDRIVER_CANDIDATES if os.path.exists(p)), None)
+        driver_path = driver_path or shutil.which("chromedriver")
+        if not driver_path:
+            # 系统中没有驱动时才使用webdriver-manager下载，仅在此处调用一次
+            try:
+                driver_path = ChromeDriverManager().install()
+                driver_source = "webdriver-manager"
+            except Exception as e:
+                logger.warning(f"webdriver-manager获取驱动失败，交由selenium自动查找: {str(e)}")
+                driver_source = "selenium-manager"
+        
+        chrome_runtime.update({
+            "binary_path": binary_path,
+            "driver_path": driver_path,
+            "driver_source": driver_source,
+            "resolved_at": datetime.utcnow().isoformat()
+        })
+        logger.info(f"浏览器运行环境解析完成: {chrome_runtime}")
+        return chrome_runtime
+
+def get_chrome_runtime():
+    """获取缓存的浏览器运行环境，未解析时先解析"""
+    return chrome_runtime or resolve_chrome_runtime()
+
+# 浏览器进程内存采样 - 直接读取/proc，统计chromedriver及其子进程(Chromium)的常驻内存
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def driver_pid(driver):
+    """取WebDriver对应的chromedriver进程号"""
+    process = getattr(getattr(driver, "service", None), "process", None)
+    return getattr(process, "pid", None)
+
+def process_tree_rss(root_pids):
+    """一次扫描/proc，返回每个根进程所在进程树的常驻内存字节数"""
+    children = defaultdict(list)
+    rss = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return {}
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            with open(f"/proc/{entry}/statm") as f:
+                rss[int(entry)] = int(f.read().split()[1]) * PAGE_SIZE
+        except (OSError, ValueError, IndexError):
+            continue
+        children[ppid].append(int(entry))
+    
+    result = {}
+    for root_pid in root_pids:
+        total = 0
+        stack = [root_pid]
+        while stack:
+            pid = stack.pop()
+            total += rss.get(pid, 0)
+            stack.extend(children.get(pid, []))
+        result[root_pid] = total
+    return result
+
+# 浏览器驱动池 - 每个账号保持一个常驻WebDriver
+class DriverPool:
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.stats = defaultdict(int)
+        self.recycle_counts = defaultdict(lambda: defaultdict(int))
+
+    def _is_healthy(self, driver):
+        """健康检查 - 浏览器仍可响应脚本调用"""
+        try:
+            return driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def _quit(self, driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def acquire(self, username, config):
+        """取出账号的常驻驱动，超龄、超次数或不健康时回收并返回None"""
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None or entry["in_use"]:
+                self.stats["misses"] += 1
+                return None
+            entry["in_use"] = True
+
+        reason = None
+        if time.time() - entry["created_at"] > config.driver_max_age:
+            reason = "max_age"
+        elif entry["uses"] >= config.driver_max_uses:
+            reason = "max_uses"
+        elif entry["rss_bytes"] > config.driver_max_memory_mb * 1024 * 1024:
+            reason = "memory"
+        elif not self._is_healthy(entry["driver"]):
+            reason = "unhealthy"
+
+        if reason:
+            self.discard(username, reason)
+            self.stats["misses"] += 1
+            return None
+
+        entry["uses"] += 1
+        entry["last_used"] = time.time()
+        self.stats["hits"] += 1
+        return entry["driver"]
+
+    def release(self, username, driver):
+        """归还驱动，新启动的驱动在此登记入池"""
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                now = time.time()
+                self._entries[username] = {
+                    "driver": driver,
+                    "created_at": now,
+                    "last_used": now,
+                    "uses": 1,
+                    "in_use": False,
+                    "pid": driver_pid(driver),
+                    "rss_bytes": 0
+                }
+                self.stats["created"] += 1
+                return
+            if entry["driver"] is driver:
+                entry["in_use"] = False
+                return
+        # 该账号已有其他驱动在池中，临时驱动直接关闭
+        self._quit(driver)
+
+    def discard(self, username, reason="manual"):
+        """移除并关闭账号的驱动"""
+        with self._lock:
+            entry = self._entries.pop(username, None)
+        if entry is None:
+            return
+        self._quit(entry["driver"])
+        self.stats[f"recycled_{reason}"] += 1
+        self.recycle_counts[username][reason] += 1
+        logger.info(f"回收浏览器驱动: {username}, 原因: {reason}")
+
+    def prune(self, keep_usernames):
+        """回收不在活跃账号列表中的空闲驱动"""
+        with self._lock:
+            stale = [u for u, e in self._entries.items() if u not in keep_usernames and not e["in_use"]]
+        for username in stale:
+            self.discard(username, "inactive")
+
+    def check_memory(self, config):
+        """采样每个驱动进程树的内存，回收超出内存上限或存活时间的空闲驱动"""
+        with self._lock:
+            entries = [(u, e) for u, e in self._entries.items() if e["pid"]]
+        rss_by_pid = process_tree_rss([e["pid"] for _, e in entries])
+        
+        limit = config.driver_max_memory_mb * 1024 * 1024
+        now = time.time()
+        to_recycle = []
+        for username, entry in entries:
+            entry["rss_bytes"] = rss_by_pid.get(entry["pid"], 0)
+            if entry["in_use"]:
+                # 使用中的驱动在下次取出时按内存和存活时间判断回收
+                continue
+            if entry["rss_bytes"] > limit:
+                to_recycle.append((username, "memory"))
+            elif now - entry["created_at"] > config.driver_max_age:
+                to_recycle.append((username, "max_age"))
+        
+        for username, reason in to_recycle:
+            logger.warning(f"内存巡检回收驱动: {username}, 原因: {reason}")
+            self.discard(username, reason)
+        return len(to_recycle)
+
+    def memory_status(self):
+        """每个账号的浏览器内存和回收次数"""
+        now = time.time()
+        with self._lock:
+            entries = dict(self._entries)
+        usernames = set(entries) | set(self.recycle_counts)
+        accounts = []
+        for username in sorted(usernames):
+            entry = entries.get(username)
+            accounts.append({
+                "account": username,
+                "active": entry is not None,
+                "rss_mb": round(entry["rss_bytes"] / 1024 / 1024, 1) if entry else 0,
+                "age_seconds": round(now - entry["created_at"], 1) if entry else 0,
+                "recycle_count": sum(self.recycle_counts[username].values()),
+                "recycle_reasons": dict(self.recycle_counts[username])
+            })
+        return accounts
+
+    def shutdown(self):
+        """关闭池中全部驱动"""
+        with self._lock:
+            usernames = list(self._entries.keys())
+        for username in usernames:
+            self.discard(username, "shutdown")
+        logger.info(f"浏览器驱动池已关闭，共回收 {len(usernames)} 个驱动")
+
+    def status(self):
+        now = time.time()
+        with self._lock:
+            drivers = [{
+                "account": username,
+                "age_seconds": round(now - e["created_at"], 1),
+                "idle_seconds": round(now - e["last_used"], 1),
+                "uses": e["uses"],
+                "in_use": e["in_use"],
+                "rss_mb": round(e["rss_bytes"] / 1024 / 1024, 1)
+            } for username, e in self._entries.items()]
+        return {"pool_size": len(drivers), "drivers": drivers, "stats": dict(self.stats)}
+
+driver_pool = DriverPool()
+
+# 共享浏览器 - 单个Chromium进程，每个账号使用独立的浏览器上下文隔离cookie
+class SharedBrowser:
+    def __init__(self):
+        self.driver = None
+        self.created_at = None
+        self.contexts = {}
+        self.stale = set()  # 已迁移到其他共享浏览器的账号，下次使用本浏览器时销毁其上下文
+        # 同一个WebDriver会话的命令和窗口切换不能并发，账号之间串行使用
+        self.lock = threading.RLock()
+        self.stats = defaultdict(int)
+        self.rss_bytes = 0
+        self.recycle_counts = defaultdict(int)
+
+    def _is_healthy(self):
+        try:
+            self.driver.window_handles
+            return True
+        except Exception:
+            return False
+
+    def attach(self, crawler):
+        """为账号切换到其独立上下文的标签页，返回(driver, 是否复用已有上下文)，调用方须持有lock"""
+        reason = self.recycle_reason(crawler.config)
+        if reason:
+            # 一直忙碌、巡检取不到lock的浏览器在下次使用时回收
+            self.recycle(reason)
+        if self.driver is None or not self._is_healthy():
+            self.shutdown()
+            if not crawler.launch_driver():
+                return None, False
+            self.driver = crawler.driver
+            self.created_at = time.time()
+            self.stats["launched"] += 1
+
+        for stale_username in list(self.stale):
+            self.stale.discard(stale_username)
+            self.close_context(stale_username)
+
+        username = crawler.account.username
+        context = self.contexts.get(username)
+        if context is not None:
+            try:
+                self.driver.switch_to.window(context["target_id"])
+                context["uses"] += 1
+                return self.driver, True
+            except Exception:
+                self.close_context(username)
+
+        context_id = self.driver.execute_cdp_cmd("Target.createBrowserContext", {"disposeOnDetach": False})["browserContextId"]
+        target_id = self.driver.execute_cdp_cmd("Target.createTarget", {
+            "url": "about:blank",
+            "browserContextId": context_id
+        })["targetId"]
+        self.driver.switch_to.window(target_id)
+        if crawler.config.lightweight_profile:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_RESOURCE_PATTERNS})
+        self.contexts[username] = {
+            "context_id": context_id,
+            "target_id": target_id,
+            "created_at": time.time(),
+            "uses": 1
+        }
+        self.stats["contexts_created"] += 1
+        logger.info(f"创建独立浏览器上下文: {username}")
+        return self.driver, False
+
+    def close_context(self, username):
+        """销毁账号的浏览器上下文（同时关闭其标签页和cookie）"""
+        with self.lock:
+            context = self.contexts.pop(username, None)
+            if context is None or self.driver is None:
+                return
+            try:
+                self.driver.execute_cdp_cmd("Target.disposeBrowserContext", {"browserContextId": context["context_id"]})
+                self.driver.switch_to.window(self.driver.window_handles[0])
+            except Exception:
+                pass
+            self.stats["contexts_closed"] += 1
+
+    def prune(self, keep_usernames):
+        """销毁不在活跃账号列表中的上下文"""
+        for username in [u for u in list(self.contexts) if u not in keep_usernames]:
+            self.close_context(username)
+
+    def recycle_reason(self, config):
+        """超出内存上限或存活时间时返回回收原因（内存取最近一次巡检的采样）"""
+        if self.driver is None:
+            return None
+        if self.rss_bytes > config.driver_max_memory_mb * 1024 * 1024:
+            return "memory"
+        if time.time() - self.created_at > config.driver_max_age:
+            return "max_age"
+        return None
+
+    def recycle(self, reason):
+        """关闭浏览器并丢弃其全部上下文，下次使用时重新启动，账号需重新登录"""
+        with self.lock:
+            contexts = len(self.contexts)
+            self.shutdown()
+            self.rss_bytes = 0
+            self.recycle_counts[reason] += 1
+            self.stats[f"recycled_{reason}"] += 1
+        logger.info(f"回收共享浏览器, 原因: {reason}, 丢弃上下文: {contexts}")
+
+    def shutdown(self):
+        """关闭共享浏览器"""
+        with self.lock:
+            self.contexts.clear()
+            self.stale.clear()
+            if self.driver is not None:
+                try:
+                    self.driver.quit()
+                except Exception:
+                    pass
+                self.driver = None
+                self.created_at = None
+
+    def status(self):
+        now = time.time()
+        return {
+            "running": self.driver is not None,
+            "age_seconds": round(now - self.created_at, 1) if self.created_at else 0,
+            "rss_mb": round(self.rss_bytes / 1024 / 1024, 1),
+            "recycle_count": sum(self.recycle_counts.values()),
+            "recycle_reasons": dict(self.recycle_counts),
+            "contexts": [{
+                "account": username,
+                "age_seconds": round(now - c["created_at"], 1),
+                "uses": c["uses"]
+            } for username, c in list(self.contexts.items())],
+            "stats": dict(self.stats)
+        }
+
+# 共享浏览器组 - 固定数量的共享浏览器，同一浏览器内的账号串行，不同浏览器之间并行
+class SharedBrowserPool:
+    def __init__(self):
+        self.browsers = []
+        self.available = threading.Condition()
+        self.moved_accounts = 0
+
+    def acquire(self, crawler):
+        """选出一个空闲的共享浏览器并持有其lock返回。
+        优先使用已有该账号上下文的浏览器；它正忙而其他浏览器空闲时改用空闲的（需重新登录），
+        避免一个慢登录拖住同一浏览器上的其他账号；全部忙时等待任意一个释放"""
+        username = crawler.account.username
+        with self.available:
+            while len(self.browsers) < max(1, crawler.config.shared_browser_count):
+                self.browsers.append(SharedBrowser())
+            while True:
+                browsers = list(self.browsers)
+                home = next((b for b in browsers if username in b.contexts and username not in b.stale), None)
+                others = sorted((b for b in browsers if b is not home), key=lambda b: len(b.contexts))
+                candidates = ([home] if home is not None else []) + others
+                chosen = next((b for b in candidates if b.lock.acquire(blocking=False)), None)
+                if chosen is not None:
+                    break
+                self.available.wait(timeout=1)
+
+        if home is not None and chosen is not home:
+            self.moved_accounts += 1
+            logger.info(f"账号所在共享浏览器正忙，改用空闲的共享浏览器: {username}")
+        # 账号在其他浏览器里的旧上下文交给对应浏览器下次使用时销毁
+        for browser in browsers:
+            if browser is not chosen and username in browser.contexts:
+                browser.stale.add(username)
+        chosen.stale.discard(username)
+        return chosen
+
+    def release(self, browser):
+        browser.lock.release()
+        with self.available:
+            self.available.notify_all()
+
+    def close_context(self, username):
+        for browser in list(self.browsers):
+            if username in browser.contexts:
+                browser.close_context(username)
+
+    def prune(self, keep_usernames):
+        for browser in list(self.browsers):
+            browser.prune(keep_usernames)
+
+    def shutdown(self):
+        for browser in list(self.browsers):
+            browser.shutdown()
+
+    def sample_memory(self):
+        """采样每个共享浏览器进程树的内存"""
+        browsers = [(b, driver_pid(b.driver)) for b in list(self.browsers) if b.driver is not None]
+        rss_by_pid = process_tree_rss([pid for _, pid in browsers if pid])
+        for browser, pid in browsers:
+            browser.rss_bytes = rss_by_pid.get(pid, 0) if pid else 0
+        return browsers
+
+    def check_memory(self, config):
+        """回收超出内存上限或存活时间的空闲共享浏览器，正在使用的留到下次使用时回收"""
+        recycled = 0
+        for browser, _ in self.sample_memory():
+            if not browser.recycle_reason(config) or not browser.lock.acquire(blocking=False):
+                continue
+            try:
+                # 取得lock期间浏览器可能已被重启，重新判断
+                reason = browser.recycle_reason(config)
+                if reason:
+                    logger.warning(f"内存巡检回收共享浏览器, 原因: {reason}, 内存: {browser.rss_bytes / 1024 / 1024:.1f}MB")
+                    browser.recycle(reason)
+                    recycled += 1
+            finally:
+                self.release(browser)
+        return recycled
+
+    def memory_status(self):
+        """每个共享浏览器的内存、上下文数和回收次数"""
+        self.sample_memory()
+        now = time.time()
+        return [{
+            "browser": index,
+            "running": browser.driver is not None,
+            "rss_mb": round(browser.rss_bytes / 1024 / 1024, 1),
+            "age_seconds": round(now - browser.created_at, 1) if browser.created_at else 0,
+            "contexts": len(browser.contexts),
+            "recycle_count": sum(browser.recycle_counts.values()),
+            "recycle_reasons": dict(browser.recycle_counts)
+        } for index, browser in enumerate(list(self.browsers))]
+
+    def status(self):
+        return {
+            "browsers": [browser.status() for browser in list(self.browsers)],
+            "moved_accounts": self.moved_accounts
+        }
+
+shared_browsers = SharedBrowserPool()
+
+# 优化的师门登录爬虫类
+class OptimizedGuildCrawler:
+    def __init__(self, account: CrawlerAccount, config: CrawlerConfig):
+        self.account = account
+        self.config = config
+        self.driver = None
+        self.driver_reused = False
+        self.shared_browser = None
+        self.session_reused = False
+        self.page_metrics = []
+        self.login_timings = {}
+        self.login_error_baseline = 0
+        self.row_stats = {"total": 0, "changed": 0, "skipped": 0}
+        self.page_fingerprint = None
+        self.page_unchanged = False
+        self.last_data = {}
+        
+    def setup_driver(self):
+        """设置浏览器驱动 - 优先复用驱动池中的常驻驱动"""
+        if self.config.browser_mode == "shared":
+            self.shared_browser = shared_browsers.acquire(self)
+            try:
+                self.driver, self.driver_reused = self.shared_browser.attach(self)
+            except Exception as e:
+                logger.error(f"共享浏览器上下文创建失败: {str(e)}")
+                self.driver = None
+            return self.driver is not None
+        if self.config.driver_pool_enabled:
+            driver = driver_pool.acquire(self.account.username, self.config)
+            if driver is not None:
+                self.driver = driver
+                self.driver_reused = True
+                logger.info(f"复用常驻浏览器驱动: {self.account.username}")
+                return True
+        return self.launch_driver()
+
+    def launch_driver(self):
+        """启动新的浏览器驱动"""
+        try:
+            chrome_options = Options()
+            if self.config.headless:
+                chrome_options.add_argument("--headless")
+            chrome_options.add_argument("--no-sandbox")
+            chrome_options.add_argument("--disable-dev-shm-usage")
+            chrome_options.add_argument("--disable-gpu")
+            chrome_options.add_argument("--window-size=1920,1080")
+            chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36")
+            chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+            chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+            chrome_options.add_experimental_option('useAutomationExtension', False)
+            
+            # 轻量配置：DOM就绪即返回，关闭扩展和后台网络等子系统
+            if self.config.lightweight_profile:
+                chrome_options.page_load_strategy = "eager"
+                for arg in LIGHTWEIGHT_CHROME_ARGS:
+                    chrome_options.add_argument(arg)
+            
+            # 使用启动时解析好的浏览器和驱动路径
+            runtime = get_chrome_runtime()
+            if runtime["binary_path"]:
+                chrome_options.binary_location = runtime["binary_path"]
+            service = Service(runtime["driver_path"]) if runtime["driver_path"] else Service()
+            self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            
+            self.driver.set_page_load_timeout(self.config.timeout)
+            
+            # 通过CDP屏蔽图片、字体、样式等非必要资源
+            if self.config.lightweight_profile:
+                self.driver.execute_cdp_cmd("Network.enable", {})
+                self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_RESOURCE_PATTERNS})
+            
+            # 移除webdriver检测
+            self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            
+            logger.info(f"浏览器驱动设置完成: {self.account.username}")
+            return True
+        except Exception as e:
+            logger.error(f"浏览器驱动设置失败: {str(e)}")
+            return False
+    
+    def precise_guild_login(self):
+        """师门登录状态机 - 每个状态在DOM条件满足后立即进入下一状态，并记录各状态耗时"""
+        handlers = {
+            "load_page": self._login_load_page,
+            "fill_form": self._login_fill_form,
+            "submit": self._login_submit,
+            "await_result": self._login_await_result
+        }
+        self.login_timings = {}
+        state = "load_page"
+        
+        try:
+            logger.info(f"开始师门登录: {self.account.username}")
+            while state in handlers:
+                started = time.perf_counter()
+                next_state = handlers[state]()
+                self.login_timings[state] = round((time.perf_counter() - started) * 1000)
+                state = next_state
+            
+            if state == "success":
+                logger.info(f"✅ 师门登录成功: {self.account.username}, 各阶段耗时(ms): {self.login_timings}")
+            return state == "success"
+            
+        except TimeoutException:
+            logger.error(f"❌ 师门登录超时: {self.account.username}, 阶段: {state}")
+            return False
+        except Exception as e:
+            logger.error(f"❌ 师门登录过程异常: {self.account.username}, 错误: {str(e)}")
+            return False
+    
+    def _login_load_page(self):
+        """访问登录页，等到用户名、密码框和提交按钮都出现"""
+        self.driver.get(self.config.target_url)
+        WebDriverWait(self.driver, 15, poll_frequency=0.1).until(
+            lambda driver: driver.find_elements(By.NAME, "Username") and
+                           driver.find_elements(By.NAME, "Password") and
+                           driver.find_elements(By.CSS_SELECTOR, "button[type='submit'], .btn")
+        )
+        logger.info("登录页面加载完成")
+        self.record_page_metrics("login")
+        return "fill_form"
+    
+    def _login_fill_form(self):
+        """确认师门选项并填写用户名和密码"""
+        try:
+            select_element = self.driver.find_element(By.NAME, "sprite_type")
+            if select_element.get_attribute("value") != "sm":
+                select_element.send_keys("sm")
+            logger.info("✅ 师门选项确认选中")
+        except Exception as e:
+            logger.warning(f"师门选项设置警告: {e}")
+        
+        try:
+            username_field = self.driver.find_element(By.NAME, "Username")
+            username_field.clear()
+            username_field.send_keys(self.account.username)
+            logger.info(f"✅ 用户名填写完成: {self.account.username}")
+        except NoSuchElementException:
+            logger.error("❌ 未找到用户名输入框")
+            return "failed"
+        
+        try:
+            password_field = self.driver.find_element(By.NAME, "Password")
+            password_field.clear()
+            password_field.send_keys(self.account.password)
+            logger.info("✅ 密码填写完成")
+        except NoSuchElementException:
+            logger.error("❌ 未找到密码输入框")
+            return "failed"
+        
+        return "submit"
+    
+    def _login_submit(self):
+        """记录提交前的错误提示数量，然后点击登录按钮"""
+        self.login_error_baseline = len(self.driver.find_elements(By.XPATH, LOGIN_ERROR_XPATH))
+        
+        buttons = self.driver.find_elements(By.CSS_SELECTOR, "button[type='submit']") or \
+                  self.driver.find_elements(By.CLASS_NAME, "btn")
+        if not buttons:
+            logger.error("❌ 未找到登录按钮")
+            return "failed"
+        buttons[0].click()
+        logger.info("✅ 登录按钮点击成功")
+        return "await_result"
+    
+    def _login_await_result(self):
+        """等待登录结果 - 只探测URL、密码框和新出现的错误提示，不读取整页源码"""
+        def login_outcome(driver):
+            if driver.current_url != self.config.target_url:
+                return "success"
+            if not driver.find_elements(By.XPATH, "//input[@type='password']"):
+                return "success"
+            if not driver.find_elements(By.XPATH, "//*[contains(text(), '后台管理')]"):
+                return "success"
+            if len(driver.find_elements(By.XPATH, LOGIN_ERROR_XPATH)) > self.login_error_baseline:
+                return "failed"
+            return False
+        
+        outcome = WebDriverWait(self.driver, 25, poll_frequency=0.1).until(login_outcome)
+        
+        if outcome == "failed":
+            logger.error("🚨 登录失败，可能是账号密码错误")
+            return "failed"
+        
+        current_url = self.driver.current_url
+        session_monitor_urls[self.account.username] = current_url
+        logger.info(f"🎯 当前URL: {current_url}")
+        return "success"
+    
+    def record_page_metrics(self, page):
+        """记录当前页面的传输字节数和加载耗时"""
+        try:
+            metrics = self.driver.execute_script(PAGE_METRICS_SCRIPT)
+            metrics["page"] = page
+            self.page_metrics.append(metrics)
+        except Exception as e:
+            logger.debug(f"页面指标采集失败: {str(e)}")
+
+    def is_login_page(self):
+        """判断当前是否停留在登录页 - 只探测密码输入框，不读取整页源码"""
+        if self.driver.current_url.rstrip('/') == self.config.target_url.rstrip('/'):
+            return len(self.driver.find_elements(By.NAME, "Password")) > 0
+        return len(self.driver.find_elements(By.XPATH, "//input[@type='password']")) > 0
+
+    def resume_session(self):
+        """常驻驱动的会话仍有效时直接进入监控页，被重定向回登录页则返回False"""
+        monitor_url = session_monitor_urls.get(self.account.username)
+        if not monitor_url:
+            return False
+        try:
+            self.driver.get(monitor_url)
+            if self.is_login_page():
+                logger.info(f"会话已失效，需要重新登录: {self.account.username}")
+                return False
+            logger.info(f"♻️ 会话仍有效，跳过登录: {self.account.username}")
+            return True
+        except Exception as e:
+            logger.warning(f"会话复用检查失败: {self.account.username}, 错误: {str(e)}")
+            return False
+    
+    def extract_guild_data(self):
+        """提取师门监控数据"""
+        try:
+            logger.info("开始提取师门数据...")
+            
+            # 等待数据表格加载
+            WebDriverWait(self.driver, 10).until(
+                EC.presence_of_element_located((By.TAG_NAME, "table"))
+            )
+            
+            self.record_page_metrics("monitor")
+            
+            # 优先在页面内直接取出表格单元格文本，失败时回退到整页源码解析
+            table = None
+            if self.config.extraction_mode == "script":
+                try:
+                    signature = MONITOR_TABLE_SIGNATURE if self.config.table_mode == "monitor" else None
+                    table = self.driver.execute_script(TABLE_ROWS_SCRIPT, signature)
+                except Exception as e:
+                    logger.warning(f"页面内表格提取失败，回退到源码解析: {str(e)}")
+            
+            if table is not None:
+                data_list = self.build_guild_data(table["rows"], table["header"])
+            else:
+                data_list = self.parse_guild_html(self.driver.page_source)
+            logger.info(f"成功提取 {self.row_stats['total']} 条师门数据，其中 {self.row_stats['changed']} 条有变化")
+            return data_list
+            
+        except Exception as e:
+            logger.error(f"提取师门数据失败: {str(e)}")
+            return []
+    
+    def unchanged_page(self, html):
+        """整页HTML与上个周期完全一致时返回上个周期的指纹记录"""
+        self.page_fingerprint = hashlib.blake2b(html.encode('utf-8'), digest_size=16).digest()
+        previous = page_fingerprints.get(self.account.username)
+        if previous and previous["page"] == self.page_fingerprint:
+            return previous
+        return None
+    
+    def parse_guild_html(self, html):
+        """解析监控页HTML为师门数据行 - 浏览器与HTTP引擎共用"""
+        previous = self.unchanged_page(html)
+        if previous:
+            return self.skip_unchanged_page(previous)
+        
+        target_url = self.config.target_url if self.config.table_mode == "monitor" else None
+        if self.config.parse_in_process_pool:
+            header, rows = submit_parse_job(html, self.config, target_url).result()
+        else:
+            header, rows = html_monitor_table(html, self.config.html_parser, target_url)
+        return self.build_guild_data(rows, header)
+    
+    def skip_unchanged_page(self, previous):
+        """页面与上个周期一致 - 跳过解析、关键词检查、累计和保存"""
+        self.page_unchanged = True
+        self.row_stats = {"total": previous["total"], "changed": 0, "skipped": previous["total"]}
+        return []
+    
+    def build_guild_data(self, rows, header=None):
+        """将(序号, 单元格文本列表)转换为师门数据 - 按表头列映射逐行一次取值，原始单元格未变化的行直接跳过"""
+        # 数据行与上个周期完全一致时整页跳过
+        rows_fingerprint = hash((tuple(header) if header else None, tuple((i, tuple(cells)) for i, cells in rows)))
+        previous = page_fingerprints.get(self.account.username)
+        if previous and previous["rows"] == rows_fingerprint:
+            if self.page_fingerprint is not None:
+                previous["page"] = self.page_fingerprint
+            return self.skip_unchanged_page(previous)
+        
+        indexes = column_indexes(header)
+        pending = []
+        crawl_timestamp = datetime.utcnow()
+        crawl_timestamp_ms = to_epoch_ms(crawl_timestamp)
+        username = self.account.username
+        self.row_stats = {"total": len(rows), "changed": 0, "skipped": 0}
+        
+        for i, cells in rows:
+            n = len(cells)
+            (ip, type_text, name, level_text, guild, skill,
+             count_text, total_time, status_text, runtime) = [
+                cells[k] if k is not None and k < n else "" for k in indexes
+            ]
+            
+            row_key = (username, i, ip)
+            row_hash = hash(tuple(cells))
+            if row_hashes.get(row_key) == row_hash:
+                self.row_stats["skipped"] += 1
+                self.check_keywords(status_text, i)
+                continue
+            
+            try:
+                count_current, count_total = to_counts(count_text)
+                total_time_current, total_time_total = to_counts(total_time)
+                
+                # 检查关键词
+                self.check_keywords(status_text, i)
+                
+                # 数据累计逻辑
+                accumulated_count, cycle_count = self.calculate_accumulated_data(
+                    username, i, count_current, count_total
+                )
+                
+                pending.append((row_key, row_hash, {
+                    "id": "",
+                    "account_username": username,
+                    "sequence_number": i,
+                    "ip": ip,
+                    "type": type_text,
+                    "name": name,
+                    "level": to_level(level_text),
+                    "guild": guild,
+                    "skill": skill,
+                    "count_current": count_current,
+                    "count_total": count_total,
+                    "total_time": total_time,
+                    "status": status_text,
+                    "runtime": runtime,
+                    "crawl_timestamp": crawl_timestamp,
+                    "accumulated_count": accumulated_count,
+                    "cycle_count": cycle_count,
+                    "runtime_seconds": to_seconds(runtime),
+                    "total_time_current": total_time_current,
+                    "total_time_total": total_time_total,
+                    "crawl_timestamp_ms": crawl_timestamp_ms
+                }))
+            except Exception as e:
+                logger.warning(f"解析数据行失败: {str(e)}")
+                continue
+        
+        data_list = self.validate_rows(pending)
+        self.row_stats["changed"] = len(data_list)
+        
+        if rows:
+            close_keyword_states(username, {i for i, _ in rows})
+            page_fingerprints[self.account.username] = {
+                "page": self.page_fingerprint,
+                "rows": rows_fingerprint,
+                "total": len(rows)
+            }
+        return data_list
+    
+    def validate_rows(self, pending):
+        """整批校验待保存的数据行，批量失败时逐行校验以跳过异常行"""
+        try:
+            data_list = GUILD_ROWS_ADAPTER.validate_python([row for _, _, row in pending])
+            valid = pending
+        except ValidationError:
+            data_list, valid = [], []
+            for item in pending:
+                try:
+                    data_list.extend(GUILD_ROWS_ADAPTER.validate_python([item[2]]))
+                    valid.append(item)
+                except ValidationError as e:
+                    logger.warning(f"解析数据行失败: {str(e)}")
+        
+        for row_key, row_hash, _ in valid:
+            row_hashes[row_key] = row_hash
+        return data_list
+    
+    def check_keywords(self, text, sequence_number=None):
+        """检查关键词并统计（只统计角色进入关键词状态的次数）"""
+        global keyword_stats
+        role_key = (self.account.username, sequence_number)
+        state = keyword_states.get(role_key)
+        # 状态文本和关键词列表都没变，关键词状态不可能变化，无需重新扫描
+        if state is not None and state["text"] == text and state["matcher"] is keyword_matcher:
+            return
+        
+        matcher = keyword_matcher
+        found = matcher.find(text)
+        now = time.time()
+        # 重新读取并替换状态须在锁内完成，以免与回溯补录、关键词删除的替换互相覆盖
+        with keyword_state_lock:
+            state = keyword_states.get(role_key)
+            previous = state["keywords"] if state is not None else {}
+            active = {keyword: previous.get(keyword, now) for keyword in found}
+            keyword_states[role_key] = {"text": text, "matcher": matcher, "keywords": active}
+        
+        for keyword in found:
+            if keyword in previous:
+                continue
+            keyword_stats[keyword] += 1
+            keyword_hit_windows.record(keyword, self.account.username, sequence_number)
+            keyword_alert_broker.publish(keyword, self.account.username, sequence_number, text)
+            logger.warning(f"发现关键词: {keyword} 在文本: {text}")
+        
+        for keyword, entered_at in previous.items():
+            if keyword not in active:
+                record_keyword_duration(keyword, now - entered_at)
+                logger.info(f"关键词状态结束: {keyword} 账号: {self.account.username} 序号: {sequence_number} 持续 {now - entered_at:.0f} 秒")
+    
+    def calculate_accumulated_data(self, username, seq_num, current_count, total_count):
+        """计算累计数据逻辑"""
+        global accumulated_data
+        
+        key = f"{username}_{seq_num}"
+        
+        if key not in accumulated_data:
+            accumulated_data[key] = {
+                "last_count": current_count,
+                "accumulated": 0,
+                "cycles": 0
+            }
+        
+        last_data = accumulated_data[key]
+        
+        # 检测重置（从高数值跳到低数值，如 11/199 → 1/199）
+        if current_count < last_data["last_count"] and last_data["last_count"] > total_count * 0.05:
+            last_data["accumulated"] += last_data["last_count"]
+            last_data["cycles"] += 1
+            logger.info(f"数据重置检测: {username} seq{seq_num} 从 {last_data['last_count']} 重置到 {current_count}")
+        
+        last_data["last_count"] = current_count
+        
+        return last_data["accumulated"] + current_count, last_data["cycles"]
+    
+    def save_data(self, data_list):
+        """保存数据到内存"""
+        global memory_data, crawl_history
+        
+        # 保存历史记录
+        crawl_history.append({
+            "timestamp": datetime.utcnow(),
+            "account": self.account.username,
+            "success": self.row_stats["total"] > 0,
+            "data_count": self.row_stats["total"],
+            "changed_rows": self.row_stats["changed"],
+            "skipped_rows": self.row_stats["skipped"],
+            "session_reused": self.session_reused,
+            "page_metrics": self.page_metrics,
+            "login_timings": self.login_timings
+        })
+        
+        # 只更新有变化的行，通过索引直接定位已有记录
+        for data_item in data_list:
+            key = (data_item.account_username, data_item.sequence_number, data_item.ip)
+            index = memory_index.get(key)
+            if index is not None and not memory_row_matches(index, key):
+                rebuild_memory_index()
+                index = memory_index.get(key)
+            
+            if index is not None:
+                # 同一行沿用已有的记录ID
+                data_item.id = memory_data[index].id
+                memory_data[index] = data_item
+            else:
+                data_item.id = str(uuid.uuid4())
+                memory_index[key] = len(memory_data)
+                memory_data.append(data_item)
+            keyword_text_index.add(data_item)
+        
+        logger.info(f"保存师门数据: {len(data_list)} 条变化记录，跳过 {self.row_stats['skipped']} 条未变化记录")
+    
+    def run_guild_crawl(self):
+        """完整的师门爬取流程"""
+        healthy = True
+        try:
+            if not self.setup_driver():
+                return False
+            
+            # 会话仍有效时跳过登录，否则执行师门登录
+            self.session_reused = self.driver_reused and self.resume_session()
+            if not self.session_reused and not self.precise_guild_login():
+                return False
+            
+            # 提取师门数据
+            data_list = self.extract_guild_data()
+            
+            # 复用的会话未取到数据时，重新登录再试一次
+            if not self.row_stats["total"] and self.session_reused:
+                logger.info(f"复用会话未取到数据，重新登录: {self.account.username}")
+                self.session_reused = False
+                if not self.precise_guild_login():
+                    return False
+                data_list = self.extract_guild_data()
+            
+            if self.page_unchanged:
+                logger.info(f"监控页无变化，跳过解析和保存: {self.account.username}")
+                return True
+            
+            if self.row_stats["total"]:
+                self.save_data(data_list)
+                logger.info(f"师门爬取完成: {self.account.username}, 获取 {self.row_stats['total']} 条数据，变化 {self.row_stats['changed']} 条")
+                return True
+            else:
+                logger.warning(f"未获取到师门数据: {self.account.username}")
+                return False
+                
+        except Exception as e:
+            logger.error(f"师门爬取失败: {self.account.username}, 错误: {str(e)}")
+            healthy = False
+            return False
+        finally:
+            self.release_driver(healthy)
+
+    def release_driver(self, healthy=True):
+        """爬取结束后归还驱动到池中，未启用驱动池或异常时直接关闭"""
+        if self.shared_browser is not None:
+            # 共享浏览器只释放使用权，异常时销毁该账号的上下文
+            browser = self.shared_browser
+            if not healthy:
+                browser.close_context(self.account.username)
+            self.driver = None
+            self.shared_browser = None
+            shared_browsers.release(browser)
+            return
+        if not self.driver:
+            return
+        if self.config.driver_pool_enabled and healthy:
+            driver_pool.release(self.account.username, self.driver)
+            self.driver = None
+        elif self.driver_reused:
+            self.driver = None
+            driver_pool.discard(self.account.username, "error")
+        else:
+            self.close()
+    
+    def close(self):
+        """关闭浏览器"""
+        if self.driver:
+            try:
+                self.driver.quit()
+            except:
+                pass
+            self.driver = None
+
+# 监控页表格解析后端 - 单元格文本与get_text(strip=True)一致
+class HtmlParserBackend:
+    @staticmethod
+    def tables(html):
+        # 只构建table子树，忽略页面其余部分
+        return BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer('table')).find_all('table')
+
+    @staticmethod
+    def rows(table):
+        return table.find_all('tr')
+
+    @staticmethod
+    def first_row(table):
+        return table.find('tr')
+
+    @staticmethod
+    def cells(row):
+        return row.find_all(['td', 'th'])
+
+    @staticmethod
+    def text(cell):
+        return cell.get_text(strip=True)
+
+class LxmlBackend:
+    @staticmethod
+    def tables(html):
+        if not html.strip():
+            return []
+        return lxml.html.fromstring(html).xpath('//table')
+
+    @staticmethod
+    def rows(table):
+        return list(table.iter('tr'))
+
+    @staticmethod
+    def first_row(table):
+        return next(table.iter('tr'), None)
+
+    @staticmethod
+    def cells(row):
+        return list(row.iter('td', 'th'))
+
+    @staticmethod
+    def text(cell):
+        return "".join(t.strip() for t in cell.itertext())
+
+class SelectolaxBackend:
+    @staticmethod
+    def tables(html):
+        return SelectolaxParser(html).css('table')
+
+    @staticmethod
+    def rows(table):
+        return table.css('tr')
+
+    @staticmethod
+    def first_row(table):
+        return table.css_first('tr')
+
+    @staticmethod
+    def cells(row):
+        return row.css('td, th')
+
+    @staticmethod
+    def text(cell):
+        return cell.text(deep=True, separator='', strip=True)
+
+HTML_PARSER_BACKENDS = {
+    "html.parser": HtmlParserBackend,
+    "lxml": LxmlBackend if lxml is not None else None,
+    "selectolax": SelectolaxBackend if SelectolaxParser is not None else None
+}
+
+# 监控表表头特征 - 表头行同时包含这些文字即认定为监控表
+MONITOR_TABLE_SIGNATURE = ["IP", "状态"]
+
+# 每个目标URL上监控表在页面表格中的位置缓存
+monitor_table_locators = {}
+
+def monitor_header(backend, table):
+    """表格首行符合监控表表头特征时返回表头文本列表，否则返回None"""
+    first_row = backend.first_row(table)
+    if first_row is None:
+        return None
+    header = [backend.text(cell) for cell in backend.cells(first_row)]
+    if len(header) >= 8 and all(any(word in h for h in header) for word in MONITOR_TABLE_SIGNATURE):
+        return header
+    return None
+
+def locate_monitor_table(backend, tables, target_url):
+    """按缓存位置或表头特征找到监控表，返回(表格, 表头)，找不到时返回(None, None)"""
+    index = monitor_table_locators.get(target_url)
+    if index is not None and index < len(tables):
+        header = monitor_header(backend, tables[index])
+        if header is not None:
+            return tables[index], header
+    for index, table in enumerate(tables):
+        header = monitor_header(backend, table)
+        if header is not None:
+            monitor_table_locators[target_url] = index
+            return table, header
+    monitor_table_locators.pop(target_url, None)
+    return None, None
+
+def html_monitor_table(html, parser="html.parser", target_url=None):
+    """从监控页HTML中取出表头和数据行，返回(表头, [(序号, 单元格文本列表), ...])
+    
+    指定target_url时只解析监控表；未找到监控表时回退为解析全部表格，表头为None。
+    """
+    backend = HTML_PARSER_BACKENDS.get(parser)
+    if backend is None:
+        if parser not in HTML_PARSER_BACKENDS:
+            logger.warning(f"未知的HTML解析器: {parser}，使用html.parser")
+        backend = HtmlParserBackend
+    
+    tables = backend.tables(html)
+    header = None
+    if target_url is not None:
+        monitor_table, header = locate_monitor_table(backend, tables, target_url)
+        if monitor_table is not None:
+            tables = [monitor_table]
+    
+    rows = []
+    for table in tables:
+        for i, row in enumerate(backend.rows(table)[1:], 1):  # 跳过表头
+            cols = backend.cells(row)
+            if len(cols) >= 8:
+                rows.append((i, [backend.text(col) for col in cols]))
+    return header, rows
+
+def html_table_rows(html, parser="html.parser", target_url=None):
+    """从监控页HTML中取出表格数据行，返回[(序号, 单元格文本列表), ...]"""
+    return html_monitor_table(html, parser, target_url)[1]
+
+# 监控页解析进程池 - 原始HTML送入子进程解析，只返回(表头, 数据行)
+parse_pool = None
+parse_pool_lock = threading.Lock()
+parse_pool_stats = {"jobs": 0, "queue_wait_total": 0.0, "queue_wait_max": 0.0, "parse_total": 0.0, "parse_max": 0.0}
+
+def parse_monitor_table_job(html, parser, target_url, submitted_at):
+    """在子进程中执行的解析任务，附带排队等待和解析耗时"""
+    started_at = time.time()
+    header, rows = html_monitor_table(html, parser, target_url)
+    return header, rows, started_at - submitted_at, time.time() - started_at
+
+def get_parse_pool(config):
+    """按需创建解析进程池，进程数默认取CPU核数"""
+    global parse_pool
+    with parse_pool_lock:
+        if parse_pool is None:
+            workers = config.parse_pool_workers or os.cpu_count() or 1
+            # 服务进程里有Selenium和asyncio的工作线程，fork会继承其持有的锁（如logging）导致子进程死锁
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            parse_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(start_method))
+            parse_pool_stats["workers"] = workers
+            logger.info(f"启动监控页解析进程池: {workers} 个进程")
+        return parse_pool
+
+def record_parse_job(future, result_future):
+    """记录排队等待与解析耗时，并把(表头, 数据行)交给调用方"""
+    try:
+        header, rows, queue_wait, parse_time = future.result()
+    except Exception as e:
+        result_future.set_exception(e)
+        return
+    with parse_pool_lock:
+        parse_pool_stats["jobs"] += 1
+        parse_pool_stats["queue_wait_total"] += queue_wait
+        parse_pool_stats["queue_wait_max"] = max(parse_pool_stats["queue_wait_max"], queue_wait)
+        parse_pool_stats["parse_total"] += parse_time
+        parse_pool_stats["parse_max"] = max(parse_pool_stats["parse_max"], parse_time)
+    result_future.set_result((header, rows))
+
+def submit_parse_job(html, config, target_url):
+    """提交解析任务到进程池，返回结果为(表头, 数据行)的Future"""
+    result_future = Future()
+    future = get_parse_pool(config).submit(parse_monitor_table_job, html, config.html_parser, target_url, time.time())
+    future.add_done_callback(lambda f: record_parse_job(f, result_future))
+    return result_future
+
+def shutdown_parse_pool():
+    """关闭解析进程池"""
+    global parse_pool
+    with parse_pool_lock:
+        if parse_pool is not None:
+            parse_pool.shutdown(wait=False, cancel_futures=True)
+            parse_pool = None
+
+# 数据列 - 按此顺序从每行中一次性取出单元格文本
+GUILD_COLUMNS = ("ip", "type", "name", "level", "guild", "skill", "count", "total_time", "status", "runtime")
+
+# 无表头时使用的默认列位置（与页面原有列顺序一致）
+DEFAULT_COLUMN_INDEXES = (1, 2, 3, 4, 5, 6, 7, 8, 9, 10)
+
+# 表头文字到数据列的映射，先精确匹配再包含匹配
+COLUMN_HEADER_ALIASES = {
+    "ip": ["IP"],
+    "type": ["类型"],
+    "name": ["命名", "名称", "角色"],
+    "level": ["等级"],
+    "guild": ["门派"],
+    "skill": ["绝技"],
+    "count": ["次数", "当前次数"],
+    "total_time": ["总时间"],
+    "status": ["状态"],
+    "runtime": ["运行时间"]
+}
+
+# 表头 -> 列位置的缓存，同一表头只构建一次
+column_index_cache = {}
+
+def column_indexes(header):
+    """根据表头构建各数据列的位置，缺失的列沿用默认位置或置为None"""
+    if not header:
+        return DEFAULT_COLUMN_INDEXES
+    key = tuple(header)
+    cached = column_index_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    labels = [h.strip().upper() for h in header]
+    resolved = {}
+    for exact in (True, False):
+        for column in GUILD_COLUMNS:
+            if column in resolved:
+                continue
+            for alias in COLUMN_HEADER_ALIASES[column]:
+                matches = [i for i, label in enumerate(labels)
+                           if i not in resolved.values() and (label == alias if exact else alias in label)]
+                if matches:
+                    resolved[column] = matches[0]
+                    break
+    
+    if "ip" not in resolved or "status" not in resolved:
+        indexes = DEFAULT_COLUMN_INDEXES
+    else:
+        used = set(resolved.values())
+        indexes = tuple(
+            resolved[column] if column in resolved else (default if default not in used else None)
+            for column, default in zip(GUILD_COLUMNS, DEFAULT_COLUMN_INDEXES)
+        )
+    column_index_cache[key] = indexes
+    return indexes
+
+COUNT_PATTERN = re.compile(r'(\d+)/(\d+)')
+
+def to_level(text):
+    return int(text) if text.isdigit() else 0
+
+def to_counts(text):
+    match = COUNT_PATTERN.match(text)
+    return (int(match.group(1)), int(match.group(2))) if match else (0, 0)
+
+def to_seconds(text):
+    """把"HH:MM:SS"或"MM:SS"格式的运行时间转换为秒数，无法解析时为0"""
+    parts = text.split(':')
+    if len(parts) > 3 or not all(part.isdigit() for part in parts):
+        return 0
+    seconds = 0
+    for part in parts:
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+def to_epoch_ms(value):
+    """把UTC无时区时间转换为毫秒时间戳"""
+    return int(value.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+def memory_row_matches(index, key):
+    """检查memory_data指定位置是否仍是该(账号, 序号, IP)的记录"""
+    if index >= len(memory_data):
+        return False
+    row = memory_data[index]
+    return (row.account_username, row.sequence_number, row.ip) == key
+
+def rebuild_memory_index():
+    """memory_data被整体替换后重建位置索引"""
+    memory_index.clear()
+    for i, row in enumerate(memory_data):
+        memory_index[(row.account_username, row.sequence_number, row.ip)] = i
+
+# 关键词回溯索引 - 新增关键词时据此补录已保存数据中的历史命中
+KEYWORD_INDEX_RETENTION_SECONDS = max(KEYWORD_HIT_WINDOWS.values())  # 只保留滑动窗口覆盖的时段
+KEYWORD_INDEX_PRUNE_INTERVAL = 60
+
+class KeywordTextIndex:
+    """状态/名称文本去重后按单字和二元组建立倒排表，每条记录另存状态文本的变化序列。
+    查找新关键词只需对其各字组的倒排表求交集再核对子串，不必重扫全部记录。
+    状态变化只保留最近一个窗口时长（每条记录的当前状态始终保留），无人引用的文本随之清除。"""
+    
+    def __init__(self, retention_seconds=KEYWORD_INDEX_RETENTION_SECONDS):
+        self.retention_seconds = retention_seconds
+        self.lock = threading.Lock()
+        self.clear()
+    
+    def clear(self):
+        with self.lock:
+            self.texts = {}  # 文本ID -> 文本
+            self.text_ids = {}  # 文本 -> 文本ID
+            self.next_text_id = 0
+            self.grams = defaultdict(set)  # 单字/二元组 -> 文本ID集合
+            self.status_postings = defaultdict(list)  # 文本ID -> [(记录ID, 在状态序列中的绝对位置)]
+            self.name_postings = defaultdict(set)  # 文本ID -> 当前名称为该文本的记录ID集合
+            self.status_history = {}  # 记录ID -> [已清除的条数, [(状态文本ID, 时间戳毫秒)]]
+            self.row_names = {}  # 记录ID -> 当前名称文本ID
+            self.row_roles = {}  # 记录ID -> (账号, 序号)
+            self.last_pruned = time.time()
+    
+    @staticmethod
+    def text_grams(text):
+        return set(text) | {text[i:i + 2] for i in range(len(text) - 1)}
+    
+    def _text_id(self, text):
+        text_id = self.text_ids.get(text)
+        if text_id is None:
+            text_id = self.next_text_id
+            self.next_text_id += 1
+            self.texts[text_id] = text
+            self.text_ids[text] = text_id
+            for gram in self.text_grams(text):
+                self.grams[gram].add(text_id)
+        return text_id
+    
+    def add(self, row):
+        """登记记录当前的状态和名称，文本未变化时不产生新的历史"""
+        with self.lock:
+            self.row_roles[row.id] = (row.account_username, row.sequence_number)
+            history = self.status_history.setdefault(row.id, [0, []])
+            base, entries = history
+            status_id = self._text_id(row.status)
+            if not entries or entries[-1][0] != status_id:
+                self.status_postings[status_id].append((row.id, base + len(entries)))
+                entries.append((status_id, row.crawl_timestamp_ms))
+            
+            name_id = self._text_id(row.name)
+            previous_name_id = self.row_names.get(row.id)
+            if previous_name_id != name_id:
+                if previous_name_id is not None:
+                    self.name_postings[previous_name_id].discard(row.id)
+                self.name_postings[name_id].add(row.id)
+                self.row_names[row.id] = name_id
+            
+            if time.time() - self.last_pruned >= KEYWORD_INDEX_PRUNE_INTERVAL:
+                self._prune()
+    
+    def _prune(self):
+        """清除超出保留时长的状态变化及其倒排项，再清除已无引用的文本"""
+        self.last_pruned = time.time()
+        cutoff_ms = int((self.last_pruned - self.retention_seconds) * 1000)
+        bases = {}
+        for row_id, history in self.status_history.items():
+            base, entries = history
+            expired = 0
+            # 当前状态（最后一条）始终保留
+            while expired < len(entries) - 1 and entries[expired][1] < cutoff_ms:
+                expired += 1
+            if expired:
+                history[0] = base + expired
+                history[1] = entries[expired:]
+                bases[row_id] = history[0]
+        
+        if bases:
+            for text_id in list(self.status_postings):
+                postings = [(row_id, position) for row_id, position in self.status_postings[text_id]
+                            if position >= bases.get(row_id, 0)]
+                if postings:
+                    self.status_postings[text_id] = postings
+                else:
+                    del self.status_postings[text_id]
+        
+        for text_id in list(self.name_postings):
+            if not self.name_postings[text_id]:
+                del self.name_postings[text_id]
+        
+        referenced = set(self.status_postings) | set(self.name_postings)
+        for text_id in [t for t in self.texts if t not in referenced]:
+            text = self.texts.pop(text_id)
+            del self.text_ids[text]
+            for gram in self.text_grams(text):
+                ids = self.grams.get(gram)
+                if ids is not None:
+                    ids.discard(text_id)
+                    if not ids:
+                        del self.grams[gram]
+    
+    def prune(self):
+        with self.lock:
+            self._prune()
+    
+    def rebuild(self, rows):
+        self.clear()
+        for row in rows:
+            self.add(row)
+    
+    def _matching_texts(self, keyword, matches):
+        if keyword_kind(keyword) != "literal":
+            # 模式关键词没有固定字组可查，逐条核对去重后的文本（远少于记录数）
+            return [text_id for text_id, text in self.texts.items() if matches(text)]
+        postings = sorted((self.grams.get(gram, ()) for gram in self.text_grams(keyword)), key=len)
+        if not postings or not postings[0]:
+            return []
+        candidates = set(postings[0]).intersection(*postings[1:])
+        return [text_id for text_id in candidates if matches(self.texts[text_id])]
+    
+    def search(self, keyword):
+        """返回保留时段内进入该关键词状态的事件，以及当前名称命中该关键词的记录ID"""
+        matches = keyword_predicate(keyword)
+        with self.lock:
+            text_ids = self._matching_texts(keyword, matches)
+            texts = self.texts
+            latest = {}
+            entries = []
+            for text_id in text_ids:
+                for row_id, position in self.status_postings.get(text_id, ()):
+                    base, history = self.status_history[row_id]
+                    offset = position - base
+                    # 上一个状态已含该关键词，说明角色一直停留在该状态，不算新的进入
+                    if offset and matches(texts[history[offset - 1][0]]):
+                        continue
+                    entries.append({
+                        "row_id": row_id,
+                        "role": self.row_roles[row_id],
+                        "text": texts[text_id],
+                        "timestamp_ms": history[offset][1],
+                        "current": False
+                    })
+                    if position >= latest.get(row_id, (-1, None))[0]:
+                        latest[row_id] = (position, entries[-1])
+            
+            for row_id, (_, entry) in latest.items():
+                entry["current"] = matches(texts[self.status_history[row_id][1][-1][0]])
+            
+            name_matches = sorted({row_id for text_id in text_ids for row_id in self.name_postings.get(text_id, ())})
+        return entries, name_matches
+    
+    def stats(self):
+        with self.lock:
+            return {
+                "distinct_texts": len(self.texts),
+                "grams": len(self.grams),
+                "records": len(self.status_history),
+                "status_changes": sum(len(entries) for _, entries in self.status_history.values()),
+                "retention_seconds": self.retention_seconds
+            }
+
+keyword_text_index = KeywordTextIndex()
+keyword_backfills = {}  # 关键词 -> 最近一次回溯补录的进度和结果
+
+def backfill_keyword(keyword):
+    """从倒排索引补录新关键词的历史命中（在线程中执行，不阻塞API）"""
+    if keyword not in MONITOR_KEYWORDS:
+        keyword_backfills.pop(keyword, None)
+        return
+    
+    started = time.perf_counter()
+    entries, name_matches = keyword_text_index.search(keyword)
+    backfilled = 0
+    for entry in entries:
+        username, sequence_number = entry["role"]
+        entered_at = entry["timestamp_ms"] / 1000
+        if entry["current"]:
+            # 角色当前仍处于该状态：登记到状态跟踪，爬虫下次扫描时不会重复计数；爬虫已计过的则跳过
+            role_key = (username, sequence_number)
+            with keyword_state_lock:
+                state = keyword_states.get(role_key)
+                if state is not None and state["text"] == entry["text"]:
+                    if keyword in state["keywords"]:
+                        continue
+                    # 换入新的状态字典，爬虫线程可能正在遍历旧字典
+                    keyword_states[role_key] = {**state, "keywords": {**state["keywords"], keyword: entered_at}}
+        keyword_stats[keyword] += 1
+        keyword_hit_windows.record(keyword, username, sequence_number, now=entered_at)
+        backfilled += 1
+    
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+    keyword_backfills[keyword] = {
+        "keyword": keyword,
+        "status": "completed",
+        "backfilled_hits": backfilled,
+        "matched_records": len({entry["row_id"] for entry in entries}),
+        "name_matched_records": name_matches,
+        "elapsed_ms": elapsed_ms,
+        "finished_at": datetime.utcnow().isoformat()
+    }
+    logger.info(f"关键词回溯补录完成: {keyword} 补录 {backfilled} 次命中，名称匹配 {len(name_matches)} 条记录，耗时 {elapsed_ms}ms")
+
+keyword_backfill_tasks = set()  # 持有后台补录任务的引用，避免运行中被垃圾回收
+
+def schedule_keyword_backfill(keywords):
+    """登记并在后台依次补录新增关键词"""
+    for keyword in keywords:
+        keyword_backfills[keyword] = {"keyword": keyword, "status": "running"}
+    task = asyncio.create_task(backfill_keywords(keywords))
+    keyword_backfill_tasks.add(task)
+    task.add_done_callback(keyword_backfill_tasks.discard)
+
+async def backfill_keywords(keywords):
+    for keyword in keywords:
+        try:
+            await asyncio.to_thread(backfill_keyword, keyword)
+        except Exception as e:
+            keyword_backfills[keyword] = {"keyword": keyword, "status": "failed", "error": str(e)}
+            logger.error(f"关键词回溯补录失败: {keyword} - {str(e)}")
+
+# 无浏览器HTTP爬虫类 - 直接提交x8login表单并复用cookie
+class HttpGuildCrawler(OptimizedGuildCrawler):
+    USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+
     def __init__(self, account: CrawlerAccount, config: CrawlerConfig):
-        self.account = account
-        self.config = config
-        self.driver = None
-        self.last_data = {}
-        
+        super().__init__(account, config)
+        self.session = None
+        self.page_html = None
+
     def setup_driver(self):
-        """设置浏览器驱动"""
+        """取出账号已有的HTTP会话，没有则新建"""
+        self.session = http_sessions.pop(self.account.username, None)
+        self.driver_reused = self.session is not None
+        if self.session is None:
+            self.session = requests.Session()
+            self.session.headers.update({"User-Agent": self.USER_AGENT})
+        return True
+
+    def is_login_page(self, html=None):
+        """判断页面是否为登录页 - 含密码输入框即视为登录页"""
+        return LOGIN_PASSWORD_INPUT.search(html if html is not None else self.page_html or "") is not None
+
+    def resume_session(self):
+        """cookie仍有效时直接获取监控页，被重定向回登录页则返回False"""
+        monitor_url = session_monitor_urls.get(self.account.username)
+        if not monitor_url:
+            return False
         try:
-            chrome_options = Options()
-            if self.config.headless:
-                chrome_options.add_argument("--headless")
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument("--disable-gpu")
-            chrome_options.add_argument("--window-size=1920,1080")
-            chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36")
-            chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-            chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            chrome_options.add_experimental_option('useAutomationExtension', False)
-            
-            # 使用系统安装的chromium浏览器
-            chrome_options.binary_location = "/usr/bin/chromium"
-            
-            # 尝试使用系统chromium驱动或自动下载适配版本
-            try:
-                # 首先尝试使用系统的chromium驱动
-                service = Service("/usr/bin/chromedriver") if os.path.exists("/usr/bin/chromedriver") else Service()
-                self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            except Exception:
-                # 如果失败，尝试自动下载适配的驱动
-                try:
-                    service = Service(ChromeDriverManager().install())
-                    self.driver = webdriver.Chrome(service=service, options=chrome_options)
-                except Exception:
-                    # 最后尝试直接启动chromium
-                    self.driver = webdriver.Chrome(options=chrome_options)
-            
-            self.driver.set_page_load_timeout(self.config.timeout)
-            
-            # 移除webdriver检测
-            self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-            
-            logger.info(f"浏览器驱动设置完成: {self.account.username}")
+            response = self.session.get(monitor_url, timeout=self.config.timeout)
+            response.raise_for_status()
+            if self.is_login_page(response.text):
+                logger.info(f"会话已失效，需要重新登录: {self.account.username}")
+                return False
+            self.page_html = response.text
+            logger.info(f"♻️ 会话仍有效，跳过登录: {self.account.username}")
             return True
         except Exception as e:
-            logger.error(f"浏览器驱动设置失败: {str(e)}")
+            logger.warning(f"会话复用检查失败: {self.account.username}, 错误: {str(e)}")
             return False
-    
+
+    def build_login_form(self, html, page_url):
+        """解析登录表单，返回(提交方式, 提交地址, 表单数据)"""
+        soup = BeautifulSoup(html, 'html.parser')
+        password_input = soup.find('input', attrs={'name': 'Password'})
+        form = password_input.find_parent('form') if password_input else None
+        
+        # 保留表单中的隐藏字段，再填入师门选项和账号密码
+        form_data = {}
+        if form:
+            for field in form.find_all(['input', 'select']):
+                name = field.get('name')
+                if name:
+                    form_data[name] = field.get('value', '')
+        form_data.update({
+            "sprite_type": "sm",
+            "Username": self.account.username,
+            "Password": self.account.password
+        })
+        
+        action = form.get('action') if form else None
+        method = (form.get('method') or 'post').lower() if form else 'post'
+        submit_url = urljoin(page_url, action) if action else page_url
+        return method, submit_url, form_data
+
+    def log_login_failure(self, html):
+        """提交后仍停留在登录页时记录失败原因"""
+        if any(keyword in html for keyword in ['错误', '失败', '用户名或密码', 'error']):
+            logger.error("🚨 登录失败，可能是账号密码错误")
+        else:
+            logger.error(f"❌ 师门登录失败: {self.account.username}")
+
     def precise_guild_login(self):
-        """精确的师门登录流程 - 基于实际页面结构优化"""
+        """HTTP方式的师门登录 - 解析登录表单后直接提交"""
         try:
-            logger.info(f"开始师门登录: {self.account.username}")
+            logger.info(f"开始师门登录(HTTP): {self.account.username}")
             
-            # 1. 访问登录页面
-            self.driver.get(self.config.target_url)
+            response = self.session.get(self.config.target_url, timeout=self.config.timeout)
+            response.raise_for_status()
             
-            # 等待页面加载完成 - 等待输入框和按钮出现
-            WebDriverWait(self.driver, 15).until(
-                lambda driver: len(driver.find_elements(By.TAG_NAME, "input")) >= 2 and
-                               len(driver.find_elements(By.TAG_NAME, "button")) >= 1
-            )
+            method, submit_url, form_data = self.build_login_form(response.text, response.url)
+            if method == 'get':
+                response = self.session.get(submit_url, params=form_data, timeout=self.config.timeout)
+            else:
+                response = self.session.post(submit_url, data=form_data, timeout=self.config.timeout)
+            response.raise_for_status()
             
-            logger.info("登录页面加载完成")
-            time.sleep(2)  # 确保页面完全渲染
+            if self.is_login_page(response.text):
+                self.log_login_failure(response.text)
+                return False
             
-            # 2. 确保师门选项被选中
-            try:
-                select_element = self.driver.find_element(By.NAME, "sprite_type")
-                if select_element.get_attribute("value") != "sm":
-                    select_element.send_keys("sm")
-                logger.info("✅ 师门选项确认选中")
-            except Exception as e:
-                logger.warning(f"师门选项设置警告: {e}")
+            self.page_html = response.text
+            session_monitor_urls[self.account.username] = response.url
+            logger.info(f"✅ 师门登录成功(HTTP): {self.account.username}")
+            logger.info(f"🎯 当前URL: {response.url}")
+            return True
             
-            # 3. 填写用户名和密码
-            logger.info("开始填写登录信息...")
+        except Exception as e:
+            logger.error(f"❌ 师门登录过程异常: {self.account.username}, 错误: {str(e)}")
+            return False
+
+    def extract_guild_data(self):
+        """解析已获取的监控页HTML"""
+        try:
+            logger.info("开始提取师门数据...")
+            if self.page_html is None:
+                response = self.session.get(session_monitor_urls[self.account.username], timeout=self.config.timeout)
+                response.raise_for_status()
+                self.page_html = response.text
             
-            # 填写用户名
-            try:
-                username_field = self.driver.find_element(By.NAME, "Username")
-                username_field.clear()
-                username_field.send_keys(self.account.username)
-                logger.info(f"✅ 用户名填写完成: {self.account.username}")
-            except Exception:
-                logger.error("❌ 未找到用户名输入框")
-                return False
+            data_list = self.parse_guild_html(self.page_html)
+            self.page_html = None
+            logger.info(f"成功提取 {self.row_stats['total']} 条师门数据，其中 {self.row_stats['changed']} 条有变化")
+            return data_list
             
-            # 填写密码
-            try:
-                password_field = self.driver.find_element(By.NAME, "Password")
-                password_field.clear()
-                password_field.send_keys(self.account.password)
-                logger.info("✅ 密码填写完成")
-            except Exception:
-                logger.error("❌ 未找到密码输入框")
+        except Exception as e:
+            logger.error(f"提取师门数据失败: {str(e)}")
+            return []
+
+    def release_driver(self, healthy=True):
+        """保留正常的HTTP会话供下个周期复用"""
+        if self.session is None:
+            return
+        if healthy:
+            http_sessions[self.account.username] = self.session
+        else:
+            self.session.close()
+        self.session = None
+
+    def close(self):
+        """关闭HTTP会话"""
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
+# 异步HTTP爬虫类 - 直接运行在事件循环上，不占用线程
+class AsyncHttpGuildCrawler(HttpGuildCrawler):
+    def __init__(self, account: CrawlerAccount, config: CrawlerConfig):
+        super().__init__(account, config)
+        self.client = None
+
+    def setup_client(self):
+        """取出账号已有的异步HTTP客户端，没有则新建"""
+        self.client = async_http_clients.pop(self.account.username, None)
+        self.driver_reused = self.client is not None
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                headers={"User-Agent": self.USER_AGENT},
+                timeout=self.config.timeout,
+                follow_redirects=True
+            )
+
+    async def resume_session_async(self):
+        """cookie仍有效时直接获取监控页，被重定向回登录页则返回False"""
+        monitor_url = session_monitor_urls.get(self.account.username)
+        if not monitor_url:
+            return False
+        try:
+            response = await self.client.get(monitor_url)
+            response.raise_for_status()
+            if self.is_login_page(response.text):
+                logger.info(f"会话已失效，需要重新登录: {self.account.username}")
                 return False
+            self.page_html = response.text
+            logger.info(f"♻️ 会话仍有效，跳过登录: {self.account.username}")
+            return True
+        except Exception as e:
+            logger.warning(f"会话复用检查失败: {self.account.username}, 错误: {str(e)}")
+            return False
+
+    async def precise_guild_login_async(self):
+        """异步HTTP方式的师门登录"""
+        try:
+            logger.info(f"开始师门登录(异步HTTP): {self.account.username}")
             
-            time.sleep(1)
+            response = await self.client.get(self.config.target_url)
+            response.raise_for_status()
             
-            # 4. 点击登录按钮
-            logger.info("查找并点击登录按钮...")
+            # 表单解析放到线程中执行，事件循环只负责网络IO
+            method, submit_url, form_data = await asyncio.to_thread(self.build_login_form, response.text, str(response.url))
+            if method == 'get':
+                response = await self.client.get(submit_url, params=form_data)
+            else:
+                response = await self.client.post(submit_url, data=form_data)
+            response.raise_for_status()
             
-            try:
-                login_button = self.driver.find_element(By.CSS_SELECTOR, "button[type='submit']")
-                login_button.click()
-                logger.info("✅ 登录按钮点击成功")
-            except Exception:
-                try:
-                    login_button = self.driver.find_element(By.CLASS_NAME, "btn")
-                    login_button.click()
-                    logger.info("✅ 通过class找到登录按钮并点击")
-                except Exception:
-                    logger.error("❌ 未找到登录按钮")
-                    return False
+            if self.is_login_page(response.text):
+                self.log_login_failure(response.text)
+                return False
             
-            # 5. 等待登录完成
-            logger.info("等待登录完成...")
+            self.page_html = response.text
+            session_monitor_urls[self.account.username] = str(response.url)
+            logger.info(f"✅ 师门登录成功(异步HTTP): {self.account.username}")
+            logger.info(f"🎯 当前URL: {response.url}")
+            return True
             
-            try:
-                # 等待页面跳转或URL变化
-                WebDriverWait(self.driver, 25).until(
-                    lambda driver: (
-                        driver.current_url != self.config.target_url or 
-                        "后台管理" not in driver.page_source or
-                        len(driver.find_elements(By.XPATH, "//input[@type='password']")) == 0
-                    )
-                )
-                
-                current_url = self.driver.current_url
-                page_title = self.driver.title
-                
-                logger.info(f"✅ 师门登录成功: {self.account.username}")
-                logger.info(f"🎯 当前URL: {current_url}")
-                logger.info(f"🎯 页面标题: {page_title}")
-                
-                time.sleep(2)  # 等待页面稳定
-                return True
-                
-            except TimeoutException:
-                logger.error(f"❌ 师门登录超时: {self.account.username}")
-                
-                # 检查是否有错误提示
-                try:
-                    page_text = self.driver.page_source
-                    if any(keyword in page_text for keyword in ['错误', '失败', '用户名或密码', 'error']):
-                        logger.error("🚨 登录失败，可能是账号密码错误")
-                    else:
-                        logger.error("🚨 登录超时，页面无响应")
-                except:
-                    pass
-                
-                return False
-                
         except Exception as e:
             logger.error(f"❌ 师门登录过程异常: {self.account.username}, 错误: {str(e)}")
             return False
-    
-    def extract_guild_data(self):
-        """提取师门监控数据"""
+
+    async def fetch_monitor_page_async(self):
+        """获取监控页HTML"""
+        response = await self.client.get(session_monitor_urls[self.account.username])
+        response.raise_for_status()
+        return response.text
+
+    async def extract_guild_data_async(self):
+        """获取并解析监控页数据"""
         try:
             logger.info("开始提取师门数据...")
+            if self.page_html is None:
+                self.page_html = await self.fetch_monitor_page_async()
             
-            # 等待数据表格加载
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.TAG_NAME, "table"))
-            )
-            
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-            tables = soup.find_all('table')
-            data_list = []
-            
-            for table in tables:
-                rows = table.find_all('tr')
-                for i, row in enumerate(rows[1:], 1):  # 跳过表头
-                    cols = row.find_all(['td', 'th'])
-                    if len(cols) >= 8:
-                        try:
-                            # 解析次数/总次数
-                            count_text = cols[7].get_text(strip=True) if len(cols) > 7 else "0/0"
-                            count_match = re.match(r'(\d+)/(\d+)', count_text)
-                            count_current = int(count_match.group(1)) if count_match else 0
-                            count_total = int(count_match.group(2)) if count_match else 0
-                            
-                            # 检查关键词
-                            status_text = cols[9].get_text(strip=True) if len(cols) > 9 else ""
-                            self.check_keywords(status_text)
-                            
-                            # 数据累计逻辑
-                            accumulated_count, cycle_count = self.calculate_accumulated_data(
-                                self.account.username, i, count_current, count_total
-                            )
-                            
-                            data_item = CrawlerData(
-                                account_username=self.account.username,
-                                sequence_number=i,
-                                ip=cols[1].get_text(strip=True) if len(cols) > 1 else "",
-                                type=cols[2].get_text(strip=True) if len(cols) > 2 else "",
-                                name=cols[3].get_text(strip=True) if len(cols) > 3 else "",
-                                level=int(cols[4].get_text(strip=True)) if len(cols) > 4 and cols[4].get_text(strip=True).isdigit() else 0,
-                                guild=cols[5].get_text(strip=True) if len(cols) > 5 else "",
-                                skill=cols[6].get_text(strip=True) if len(cols) > 6 else "",
-                                count_current=count_current,
-                                count_total=count_total,
-                                total_time=cols[8].get_text(strip=True) if len(cols) > 8 else "",
-                                status=status_text,
-                                runtime=cols[10].get_text(strip=True) if len(cols) > 10 else "",
-                                accumulated_count=accumulated_count,
-                                cycle_count=cycle_count
-                            )
-                            data_list.append(data_item)
-                        except Exception as e:
-                            logger.warning(f"解析数据行失败: {str(e)}")
-                            continue
-            
-            logger.info(f"成功提取 {len(data_list)} 条师门数据")
+            data_list = await self.parse_guild_html_async(self.page_html)
+            self.page_html = None
+            logger.info(f"成功提取 {self.row_stats['total']} 条师门数据，其中 {self.row_stats['changed']} 条有变化")
             return data_list
             
         except Exception as e:
             logger.error(f"提取师门数据失败: {str(e)}")
             return []
-    
-    def check_keywords(self, text):
-        """检查关键词并统计"""
-        global keyword_stats
-        for keyword in MONITOR_KEYWORDS:
-            if keyword in text:
-                keyword_stats[keyword] += 1
-                logger.warning(f"发现关键词: {keyword} 在文本: {text}")
-    
-    def calculate_accumulated_data(self, username, seq_num, current_count, total_count):
-        """计算累计数据逻辑"""
-        global accumulated_data
-        
-        key = f"{username}_{seq_num}"
-        
-        if key not in accumulated_data:
-            accumulated_data[key] = {
-                "last_count": current_count,
-                "accumulated": 0,
-                "cycles": 0
-            }
-        
-        last_data = accumulated_data[key]
-        
-        # 检测重置（从高数值跳到低数值，如 11/199 → 1/199）
-        if current_count < last_data["last_count"] and last_data["last_count"] > total_count * 0.05:
-            last_data["accumulated"] += last_data["last_count"]
-            last_data["cycles"] += 1
-            logger.info(f"数据重置检测: {username} seq{seq_num} 从 {last_data['last_count']} 重置到 {current_count}")
-        
-        last_data["last_count"] = current_count
-        
-        return last_data["accumulated"] + current_count, last_data["cycles"]
-    
-    def save_data(self, data_list):
-        """保存数据到内存"""
-        global memory_data, crawl_history
-        
-        # 保存历史记录
-        crawl_history.append({
-            "timestamp": datetime.utcnow(),
-            "account": self.account.username,
-            "success": len(data_list) > 0,
-            "data_count": len(data_list)
-        })
-        
-        # 更新主数据
-        for data_item in data_list:
-            # 检查是否已存在相同记录
-            existing_index = -1
-            for i, existing in enumerate(memory_data):
-                if (existing["account_username"] == data_item.account_username and
-                    existing["sequence_number"] == data_item.sequence_number and
-                    existing["ip"] == data_item.ip):
-                    existing_index = i
-                    break
-            
-            if existing_index >= 0:
-                memory_data[existing_index] = data_item.dict()
-            else:
-                memory_data.append(data_item.dict())
+
+    async def parse_guild_html_async(self, html):
+        """在线程或解析进程池中解析，不阻塞事件循环"""
+        if not self.config.parse_in_process_pool:
+            return await asyncio.to_thread(self.parse_guild_html, html)
+        previous = self.unchanged_page(html)
+        if previous:
+            return self.skip_unchanged_page(previous)
         
-        logger.info(f"保存师门数据: {len(data_list)} 条记录")
-    
-    def run_guild_crawl(self):
-        """完整的师门爬取流程"""
+        target_url = self.config.target_url if self.config.table_mode == "monitor" else None
+        header, rows = await asyncio.wrap_future(submit_parse_job(html, self.config, target_url))
+        return await asyncio.to_thread(self.build_guild_data, rows, header)
+
+    async def release_client(self, healthy=True):
+        """保留正常的客户端供下个周期复用"""
+        if self.client is None:
+            return
+        if healthy:
+            async_http_clients[self.account.username] = self.client
+        else:
+            await self.client.aclose()
+        self.client = None
+
+    async def run_guild_crawl_async(self):
+        """完整的异步师门爬取流程"""
+        healthy = True
         try:
-            if not self.setup_driver():
-                return False
+            self.setup_client()
             
-            # 执行师门登录
-            if not self.precise_guild_login():
+            # 会话仍有效时跳过登录，否则执行师门登录
+            self.session_reused = self.driver_reused and await self.resume_session_async()
+            if not self.session_reused and not await self.precise_guild_login_async():
                 return False
             
-            # 提取师门数据
-            data_list = self.extract_guild_data()
+            data_list = await self.extract_guild_data_async()
+            
+            # 复用的会话未取到数据时，重新登录再试一次
+            if not self.row_stats["total"] and self.session_reused:
+                logger.info(f"复用会话未取到数据，重新登录: {self.account.username}")
+                self.session_reused = False
+                if not await self.precise_guild_login_async():
+                    return False
+                data_list = await self.extract_guild_data_async()
+            
+            if self.page_unchanged:
+                logger.info(f"监控页无变化，跳过解析和保存: {self.account.username}")
+                return True
             
-            if data_list:
+            if self.row_stats["total"]:
                 self.save_data(data_list)
-                logger.info(f"师门爬取完成: {self.account.username}, 获取 {len(data_list)} 条数据")
+                logger.info(f"师门爬取完成: {self.account.username}, 获取 {self.row_stats['total']} 条数据，变化 {self.row_stats['changed']} 条")
                 return True
             else:
                 logger.warning(f"未获取到师门数据: {self.account.username}")
@@ -433,19 +2483,38 @@ class OptimizedGuildCrawler:
                 
         except Exception as e:
             logger.error(f"师门爬取失败: {self.account.username}, 错误: {str(e)}")
+            healthy = False
             return False
         finally:
-            if self.driver:
-                self.driver.quit()
-    
-    def close(self):
-        """关闭浏览器"""
-        if self.driver:
-            try:
-                self.driver.quit()
-            except:
-                pass
-            self.driver = None
+            await self.release_client(healthy)
+
+def create_crawler(account: CrawlerAccount, config: CrawlerConfig):
+    """按配置的爬取引擎创建爬虫"""
+    if config.crawl_engine == "async_http":
+        return AsyncHttpGuildCrawler(account, config)
+    if config.crawl_engine == "http":
+        return HttpGuildCrawler(account, config)
+    return OptimizedGuildCrawler(account, config)
+
+def close_http_sessions(keep_usernames=()):
+    """关闭不在保留列表中的HTTP会话"""
+    for username in [u for u in http_sessions if u not in keep_usernames]:
+        session = http_sessions.pop(username, None)
+        if session is not None:
+            session.close()
+
+async def close_async_http_clients(keep_usernames=()):
+    """关闭不在保留列表中的异步HTTP客户端"""
+    for username in [u for u in async_http_clients if u not in keep_usernames]:
+        client = async_http_clients.pop(username, None)
+        if client is not None:
+            await client.aclose()
+
+async def run_crawler(crawler):
+    """异步引擎直接在事件循环上运行，其他引擎放到线程中运行"""
+    if isinstance(crawler, AsyncHttpGuildCrawler):
+        return await crawler.run_guild_crawl_async()
+    return await asyncio.to_thread(crawler.run_guild_crawl)
 
 # 自动爬虫任务
 async def auto_crawl_task():
@@ -480,6 +2549,14 @@ async def auto_crawl_task():
             # 获取活跃账号进行爬取
             active_accounts = [acc for acc in accounts_db[:max_active] if acc.get("is_auto_enabled", True)]
             
+            # 回收已不再活跃账号的常驻浏览器
+            active_usernames = {acc["username"] for acc in active_accounts}
+            await asyncio.to_thread(driver_pool.prune, active_usernames)
+            await asyncio.to_thread(shared_browsers.prune, active_usernames)
+            close_http_sessions(active_usernames)
+            await close_async_http_clients(active_usernames)
+            prune_keyword_states(active_usernames)
+            
             if not active_accounts:
                 logger.info("没有可用的活跃账号")
                 await asyncio.sleep(45)
@@ -504,8 +2581,8 @@ async def auto_crawl_task():
                     
                     # 创建爬虫任务
                     account = CrawlerAccount(**acc_data)
-                    crawler = OptimizedGuildCrawler(account, config)
-                    tasks.append(asyncio.create_task(asyncio.to_thread(crawler.run_guild_crawl)))
+                    crawler = create_crawler(account, config)
+                    tasks.append(asyncio.create_task(run_crawler(crawler)))
                 
                 # 等待这批任务完成
                 results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -555,6 +2632,25 @@ async def auto_crawl_task():
                 acc["status"] = "active"
                 acc["is_auto_enabled"] = True
             await asyncio.sleep(45)
+    
+    # 自动爬虫停止后关闭所有常驻浏览器
+    await asyncio.to_thread(driver_pool.shutdown)
+    await asyncio.to_thread(shared_browsers.shutdown)
+    close_http_sessions()
+    await close_async_http_clients()
+
+# 浏览器内存巡检任务
+async def memory_watchdog_task():
+    """定期采样常驻驱动和共享浏览器的内存，超限或超龄时自动回收"""
+    logger.info("启动浏览器内存巡检任务...")
+    while True:
+        config = CrawlerConfig()
+        try:
+            await asyncio.to_thread(driver_pool.check_memory, config)
+            await asyncio.to_thread(shared_browsers.check_memory, config)
+        except Exception as e:
+            logger.error(f"浏览器内存巡检异常: {str(e)}")
+        await asyncio.sleep(config.memory_watchdog_interval)
 
 # API路由
 @api_router.get("/")
@@ -611,10 +2707,68 @@ async def get_crawler_config():
         "timeout": config.timeout,
         "max_concurrent_crawlers": config.max_concurrent_crawlers,
         "max_active_accounts": config.max_active_accounts,
+        "crawl_engine": config.crawl_engine,
+        "lightweight_profile": config.lightweight_profile,
+        "chrome_runtime": dict(chrome_runtime),
+        "driver_pool_enabled": config.driver_pool_enabled,
+        "browser_mode": config.browser_mode,
+        "shared_browser_count": config.shared_browser_count,
+        "extraction_mode": config.extraction_mode,
+        "html_parser": config.html_parser,
+        "table_mode": config.table_mode,
+        "parse_in_process_pool": config.parse_in_process_pool,
+        "available_html_parsers": [name for name, backend in HTML_PARSER_BACKENDS.items() if backend],
         "auto_crawl_enabled": auto_crawl_running,
         "version": "2.5"
     }
 
+@api_router.get("/crawler/pool")
+async def get_driver_pool_status():
+    """获取浏览器驱动池状态"""
+    status = driver_pool.status()
+    status["shared_browsers"] = shared_browsers.status()
+    return status
+
+@api_router.get("/crawler/pool/memory")
+async def get_browser_memory():
+    """获取每个账号的浏览器内存占用和回收次数"""
+    config = CrawlerConfig()
+    accounts = driver_pool.memory_status()
+    browsers = await asyncio.to_thread(shared_browsers.memory_status)
+    return {
+        "accounts": accounts,
+        "total_rss_mb": round(sum(a["rss_mb"] for a in accounts), 1),
+        "shared_browsers": browsers,
+        "shared_browser_rss_mb": round(sum(b["rss_mb"] for b in browsers), 1),
+        "max_memory_mb": config.driver_max_memory_mb,
+        "max_age_seconds": config.driver_max_age,
+        "total_recycles": sum(a["recycle_count"] for a in accounts),
+        "shared_browser_recycles": sum(b["recycle_count"] for b in browsers)
+    }
+
+@api_router.post("/crawler/pool/shutdown")
+async def shutdown_driver_pool():
+    """关闭驱动池中的全部浏览器"""
+    await asyncio.to_thread(driver_pool.shutdown)
+    await asyncio.to_thread(shared_browsers.shutdown)
+    return {"message": "浏览器驱动池已关闭"}
+
+@api_router.get("/crawler/parse-pool")
+async def get_parse_pool_status():
+    """获取解析进程池的排队等待与解析耗时统计"""
+    config = CrawlerConfig()
+    jobs = parse_pool_stats["jobs"]
+    return {
+        "enabled": config.parse_in_process_pool,
+        "running": parse_pool is not None,
+        "workers": parse_pool_stats.get("workers", config.parse_pool_workers or os.cpu_count()),
+        "jobs": jobs,
+        "avg_queue_wait_ms": round(parse_pool_stats["queue_wait_total"] / jobs * 1000, 2) if jobs else 0,
+        "max_queue_wait_ms": round(parse_pool_stats["queue_wait_max"] * 1000, 2),
+        "avg_parse_ms": round(parse_pool_stats["parse_total"] / jobs * 1000, 2) if jobs else 0,
+        "max_parse_ms": round(parse_pool_stats["parse_max"] * 1000, 2)
+    }
+
 @api_router.get("/crawler/auto/status")
 async def get_auto_crawler_status():
     return {
@@ -662,6 +2816,9 @@ async def delete_account(account_id: str):
     for i, acc in enumerate(accounts_db):
         if acc["id"] == account_id:
             deleted_account = accounts_db.pop(i)
+            await asyncio.to_thread(driver_pool.discard, deleted_account["username"], "deleted")
+            await asyncio.to_thread(shared_browsers.close_context, deleted_account["username"])
+            close_keyword_states(deleted_account["username"])
             return {"message": "账号删除成功", "account": deleted_account}
     raise HTTPException(status_code=404, detail="账号不存在")
 
@@ -685,6 +2842,9 @@ async def batch_operation(request: BatchOperationRequest):
                     acc["status"] = "active"
                 elif request.operation == "delete":
                     accounts_db.remove(acc)
+                    await asyncio.to_thread(driver_pool.discard, acc["username"], "deleted")
+                    await asyncio.to_thread(shared_browsers.close_context, acc["username"])
+                    close_keyword_states(acc["username"])
                 
                 affected_accounts.append(acc)
                 break
@@ -695,10 +2855,21 @@ async def batch_operation(request: BatchOperationRequest):
         "accounts": affected_accounts
     }
 
+def parse_filter_timestamp_ms(text):
+    """把筛选日期解析为毫秒时间戳，无时区的日期按UTC处理"""
+    value = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+# 可排序的数值字段
+SORTABLE_FIELDS = {"level", "count_current", "count_total", "accumulated_count", "cycle_count",
+                   "runtime_seconds", "total_time_current", "crawl_timestamp_ms"}
+
 # 数据管理和筛选
 @api_router.get("/crawler/data")
 async def get_data():
-    return memory_data
+    return [row.to_dict() for row in memory_data]
 
 @api_router.post("/crawler/data/filter")
 async def filter_data(filter_req: FilterRequest):
@@ -706,42 +2877,51 @@ async def filter_data(filter_req: FilterRequest):
     filtered_data = memory_data.copy()
     
     if filter_req.account_username:
-        filtered_data = [d for d in filtered_data if d["account_username"] == filter_req.account_username]
+        filtered_data = [d for d in filtered_data if d.account_username == filter_req.account_username]
     
     if filter_req.guild:
-        filtered_data = [d for d in filtered_data if filter_req.guild in d["guild"]]
+        filtered_data = [d for d in filtered_data if filter_req.guild in d.guild]
     
     if filter_req.type:
-        filtered_data = [d for d in filtered_data if filter_req.type in d["type"]]
+        filtered_data = [d for d in filtered_data if filter_req.type in d.type]
     
     if filter_req.status:
-        filtered_data = [d for d in filtered_data if filter_req.status in d["status"]]
+        filtered_data = [d for d in filtered_data if filter_req.status in d.status]
     
     if filter_req.min_level:
-        filtered_data = [d for d in filtered_data if d["level"] >= filter_req.min_level]
+        filtered_data = [d for d in filtered_data if d.level >= filter_req.min_level]
     
     if filter_req.max_level:
-        filtered_data = [d for d in filtered_data if d["level"] <= filter_req.max_level]
+        filtered_data = [d for d in filtered_data if d.level <= filter_req.max_level]
     
     if filter_req.keyword:
         filtered_data = [d for d in filtered_data if 
-                        filter_req.keyword.lower() in d["name"].lower() or
-                        filter_req.keyword.lower() in d["status"].lower()]
+                        filter_req.keyword.lower() in d.name.lower() or
+                        filter_req.keyword.lower() in d.status.lower()]
     
     if filter_req.start_date:
-        start_date = datetime.fromisoformat(filter_req.start_date.replace('Z', '+00:00'))
-        filtered_data = [d for d in filtered_data if 
-                        datetime.fromisoformat(d["crawl_timestamp"].replace('Z', '+00:00')) >= start_date]
+        start_ms = parse_filter_timestamp_ms(filter_req.start_date)
+        filtered_data = [d for d in filtered_data if d.crawl_timestamp_ms >= start_ms]
     
     if filter_req.end_date:
-        end_date = datetime.fromisoformat(filter_req.end_date.replace('Z', '+00:00'))
-        filtered_data = [d for d in filtered_data if 
-                        datetime.fromisoformat(d["crawl_timestamp"].replace('Z', '+00:00')) <= end_date]
+        end_ms = parse_filter_timestamp_ms(filter_req.end_date)
+        filtered_data = [d for d in filtered_data if d.crawl_timestamp_ms <= end_ms]
+    
+    if filter_req.min_runtime_seconds is not None:
+        filtered_data = [d for d in filtered_data if d.runtime_seconds >= filter_req.min_runtime_seconds]
+    
+    if filter_req.max_runtime_seconds is not None:
+        filtered_data = [d for d in filtered_data if d.runtime_seconds <= filter_req.max_runtime_seconds]
+    
+    if filter_req.sort_by:
+        if filter_req.sort_by not in SORTABLE_FIELDS:
+            raise HTTPException(status_code=400, detail=f"不支持的排序字段: {filter_req.sort_by}")
+        filtered_data.sort(key=attrgetter(filter_req.sort_by), reverse=filter_req.sort_desc)
     
     return {
         "total_count": len(memory_data),
         "filtered_count": len(filtered_data),
-        "data": filtered_data
+        "data": [d.to_dict() for d in filtered_data]
     }
 
 # 统计分析
@@ -753,12 +2933,12 @@ async def get_statistics():
     
     # 基础统计
     total_records = len(memory_data)
-    unique_accounts = len(set(d["account_username"] for d in memory_data))
-    unique_guilds = len(set(d["guild"] for d in memory_data if d["guild"]))
-    unique_types = len(set(d["type"] for d in memory_data if d["type"]))
+    unique_accounts = len(set(d.account_username for d in memory_data))
+    unique_guilds = len(set(d.guild for d in memory_data if d.guild))
+    unique_types = len(set(d.type for d in memory_data if d.type))
     
     # 等级统计
-    levels = [d["level"] for d in memory_data if d["level"] > 0]
+    levels = [d.level for d in memory_data if d.level > 0]
     avg_level = sum(levels) / len(levels) if levels else 0
     max_level = max(levels) if levels else 0
     min_level = min(levels) if levels else 0
@@ -766,23 +2946,26 @@ async def get_statistics():
     # 账号统计
     account_stats = defaultdict(int)
     for d in memory_data:
-        account_stats[d["account_username"]] += 1
+        account_stats[d.account_username] += 1
     
     # 门派统计
     guild_stats = defaultdict(int)
     for d in memory_data:
-        if d["guild"]:
-            guild_stats[d["guild"]] += 1
+        if d.guild:
+            guild_stats[d.guild] += 1
     
     # 类型统计
     type_stats = defaultdict(int)
     for d in memory_data:
-        if d["type"]:
-            type_stats[d["type"]] += 1
+        if d.type:
+            type_stats[d.type] += 1
     
     # 累计数据统计
-    total_accumulated = sum(d.get("accumulated_count", 0) for d in memory_data)
-    total_cycles = sum(d.get("cycle_count", 0) for d in memory_data)
+    total_accumulated = sum(d.accumulated_count for d in memory_data)
+    total_cycles = sum(d.cycle_count for d in memory_data)
+    
+    # 运行时间统计
+    runtimes = [d.runtime_seconds for d in memory_data if d.runtime_seconds > 0]
     
     return {
         "basic_stats": {
@@ -801,26 +2984,139 @@ async def get_statistics():
             "total_accumulated_count": total_accumulated,
             "total_cycles": total_cycles,
             "avg_accumulated_per_record": round(total_accumulated / total_records, 2) if total_records > 0 else 0
+        },
+        "runtime_stats": {
+            "total_runtime_seconds": sum(runtimes),
+            "avg_runtime_seconds": round(sum(runtimes) / len(runtimes), 2) if runtimes else 0,
+            "max_runtime_seconds": max(runtimes) if runtimes else 0
         }
     }
 
 # 关键词统计
+def keyword_duration_summary():
+    """已结束关键词状态的停留时长汇总"""
+    with keyword_duration_lock:
+        return {
+            keyword: {
+                "episodes": stats["episodes"],
+                "total_seconds": round(stats["total_seconds"], 1),
+                "avg_seconds": round(stats["total_seconds"] / stats["episodes"], 1),
+                "max_seconds": round(stats["max_seconds"], 1)
+            }
+            for keyword, stats in keyword_durations.items()
+        }
+
+def active_keyword_states(keyword=None, username=None):
+    """当前仍处于关键词状态的角色及已持续时长"""
+    now = time.time()
+    states = []
+    with keyword_state_lock:
+        snapshot = list(keyword_states.items())
+    for (state_username, sequence_number), state in snapshot:
+        if username is not None and state_username != username:
+            continue
+        for state_keyword, entered_at in state["keywords"].items():
+            if keyword is not None and state_keyword != keyword:
+                continue
+            states.append({
+                "keyword": state_keyword,
+                "account_username": state_username,
+                "sequence_number": sequence_number,
+                "since": datetime.utcfromtimestamp(entered_at).isoformat(),
+                "duration_seconds": round(now - entered_at, 1)
+            })
+    states.sort(key=lambda item: item["duration_seconds"], reverse=True)
+    return states
+
 @api_router.get("/crawler/keywords")
-async def get_keyword_stats():
-    """获取关键词统计"""
-    return {
+async def get_keyword_stats(window: Optional[str] = None, account: Optional[str] = None, keyword: Optional[str] = None):
+    """获取关键词统计（含最近1分钟/15分钟/1小时按账号、角色的命中）"""
+    if window is not None and window not in KEYWORD_HIT_WINDOWS:
+        raise HTTPException(status_code=400, detail=f"不支持的时间窗口: {window}，可选: {list(KEYWORD_HIT_WINDOWS)}")
+    
+    hits = keyword_hit_windows.query(keyword=keyword, username=account)
+    window_stats = {name: defaultdict(int) for name in KEYWORD_HIT_WINDOWS}
+    for (hit_keyword, _, _), sums in hits:
+        for name, count in sums.items():
+            if count:
+                window_stats[name][hit_keyword] += count
+    
+    result = {
         "keyword_stats": dict(keyword_stats),
         "total_keywords_detected": sum(keyword_stats.values()),
         "unique_keywords": len(keyword_stats),
         "monitored_keywords": MONITOR_KEYWORDS,
-        "default_keywords": DEFAULT_MONITOR_KEYWORDS
+        "default_keywords": DEFAULT_MONITOR_KEYWORDS,
+        "window_stats": {name: dict(counts) for name, counts in window_stats.items()},
+        "keyword_durations": keyword_duration_summary(),
+        "active_keyword_states": active_keyword_states(keyword=keyword, username=account),
+        "alert_stream_clients": len(keyword_alert_broker.subscribers)
     }
+    
+    if window is not None:
+        # 指定窗口时给出按账号、角色拆分的明细
+        result["window"] = window
+        result["window_hits"] = sorted((
+            {
+                "keyword": hit_keyword,
+                "account_username": username,
+                "sequence_number": sequence_number,
+                "hits": sums[window]
+            }
+            for (hit_keyword, username, sequence_number), sums in hits if sums[window]
+        ), key=lambda hit: hit["hits"], reverse=True)
+    
+    return result
+
+@api_router.get("/crawler/keywords/stream")
+async def stream_keyword_alerts(
+    keyword: Optional[List[str]] = Query(None),
+    account: Optional[List[str]] = Query(None),
+    queue_size: int = Query(KEYWORD_ALERT_QUEUE_SIZE, ge=1, le=KEYWORD_ALERT_MAX_QUEUE_SIZE)
+):
+    """以SSE实时推送关键词告警，可按关键词和账号过滤（参数可重复）"""
+    subscriber = KeywordAlertSubscriber(asyncio.get_running_loop(), keyword, account, queue_size)
+    keyword_alert_broker.subscribe(subscriber)
+    logger.info(f"关键词告警订阅: 关键词 {keyword or '全部'} 账号 {account or '全部'}")
+    
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    await asyncio.wait_for(subscriber.ready.wait(), timeout=KEYWORD_ALERT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # 心跳注释行，防止代理断开空闲连接
+                    yield ": heartbeat\n\n"
+                    continue
+                subscriber.ready.clear()
+                
+                if subscriber.dropped:
+                    yield f"event: dropped\ndata: {json.dumps({'dropped': subscriber.dropped})}\n\n"
+                    subscriber.dropped = 0
+                while subscriber.queue:
+                    alert = subscriber.queue.popleft()
+                    yield f"id: {alert['id']}\nevent: keyword_alert\ndata: {json.dumps(alert, ensure_ascii=False)}\n\n"
+        finally:
+            keyword_alert_broker.unsubscribe(subscriber)
+            logger.info("关键词告警订阅已断开")
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @api_router.post("/crawler/keywords/reset")
 async def reset_keyword_stats():
     """重置关键词统计"""
     global keyword_stats
     keyword_stats.clear()
+    keyword_hit_windows.clear()
+    with keyword_state_lock:
+        keyword_states.clear()
+    with keyword_duration_lock:
+        keyword_durations.clear()
     return {"message": "关键词统计已重置"}
 
 @api_router.post("/crawler/keywords/add")
@@ -835,12 +3131,20 @@ async def add_custom_keyword(request: KeywordRequest):
     if keyword in MONITOR_KEYWORDS:
         raise HTTPException(status_code=400, detail="关键词已存在")
     
+    try:
+        validate_new_keyword(keyword, MONITOR_KEYWORDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     MONITOR_KEYWORDS.append(keyword)
+    rebuild_keyword_matcher()
+    schedule_keyword_backfill([keyword])
     logger.info(f"添加自定义关键词: {keyword}")
     
     return {
-        "message": f"关键词 '{keyword}' 添加成功",
+        "message": f"关键词 '{keyword}' 添加成功，正在后台补录历史命中",
         "keyword": keyword,
+        "keyword_kind": keyword_kind(keyword),
         "total_keywords": len(MONITOR_KEYWORDS),
         "monitored_keywords": MONITOR_KEYWORDS
     }
@@ -857,10 +3161,20 @@ async def delete_keyword(keyword: str):
         raise HTTPException(status_code=400, detail="默认关键词不能删除")
     
     MONITOR_KEYWORDS.remove(keyword)
+    rebuild_keyword_matcher()
     
     # 同时清除该关键词的统计数据
     if keyword in keyword_stats:
         del keyword_stats[keyword]
+    keyword_hit_windows.discard_keyword(keyword)
+    with keyword_state_lock:
+        for role_key, state in list(keyword_states.items()):
+            if keyword in state["keywords"]:
+                keywords = {k: v for k, v in state["keywords"].items() if k != keyword}
+                keyword_states[role_key] = {**state, "keywords": keywords}
+    with keyword_duration_lock:
+        keyword_durations.pop(keyword, None)
+    keyword_backfills.pop(keyword, None)
     
     logger.info(f"删除关键词: {keyword}")
     
@@ -878,6 +3192,7 @@ async def batch_add_keywords(request: KeywordListRequest):
     
     added_keywords = []
     skipped_keywords = []
+    invalid_keywords = []
     
     for keyword in request.keywords:
         keyword = keyword.strip()
@@ -886,22 +3201,41 @@ async def batch_add_keywords(request: KeywordListRequest):
             
         if keyword in MONITOR_KEYWORDS:
             skipped_keywords.append(keyword)
-        else:
-            MONITOR_KEYWORDS.append(keyword)
-            added_keywords.append(keyword)
+            continue
+        
+        try:
+            validate_new_keyword(keyword, MONITOR_KEYWORDS)
+        except ValueError as e:
+            invalid_keywords.append({"keyword": keyword, "error": str(e)})
+            continue
+        
+        MONITOR_KEYWORDS.append(keyword)
+        added_keywords.append(keyword)
     
+    if added_keywords:
+        rebuild_keyword_matcher()
+        schedule_keyword_backfill(added_keywords)
     logger.info(f"批量添加关键词: {added_keywords}")
     
     return {
         "message": f"批量添加完成",
         "added_keywords": added_keywords,
         "skipped_keywords": skipped_keywords,
+        "invalid_keywords": invalid_keywords,
         "added_count": len(added_keywords),
         "skipped_count": len(skipped_keywords),
         "total_keywords": len(MONITOR_KEYWORDS),
         "monitored_keywords": MONITOR_KEYWORDS
     }
 
+@api_router.get("/crawler/keywords/backfill")
+async def get_keyword_backfills():
+    """获取新增关键词的历史回溯补录状态"""
+    return {
+        "backfills": keyword_backfills,
+        "index": keyword_text_index.stats()
+    }
+
 @api_router.get("/crawler/keywords/defaults")
 async def get_default_keywords():
     """获取默认关键词列表"""
@@ -921,6 +3255,7 @@ async def restore_default_keywords():
     
     # 重置为默认关键词 + 自定义关键词
     MONITOR_KEYWORDS = DEFAULT_MONITOR_KEYWORDS.copy() + custom_keywords
+    rebuild_keyword_matcher()
     
     logger.info("恢复默认关键词设置")
     
@@ -1010,7 +3345,18 @@ async def generate_mock_data():
                 accumulated_count=random.randint(0, 500),
                 cycle_count=random.randint(0, 5)
             )
-            memory_data.append(data.dict())
+            total_time_current, total_time_total = to_counts(data.total_time)
+            memory_data.append(GuildRow(
+                **data.dict(),
+                runtime_seconds=to_seconds(data.runtime),
+                total_time_current=total_time_current,
+                total_time_total=total_time_total,
+                crawl_timestamp_ms=to_epoch_ms(data.crawl_timestamp)
+            ))
+    rebuild_memory_index()
+    row_hashes.clear()
+    page_fingerprints.clear()
+    keyword_text_index.rebuild(memory_data)
     return {"message": f"生成了 {len(memory_data)} 条师门演示数据（v2.5增强版）"}
 
 @api_router.post("/crawler/test/{username}")
@@ -1029,10 +3375,13 @@ async def test_optimized_guild_login(username: str):
         account = CrawlerAccount(**account_data)
         config = CrawlerConfig()
         
-        crawler = OptimizedGuildCrawler(account, config)
+        crawler = create_crawler(account, config)
         
         # 执行完整的师门爬取流程
-        success = crawler.run_guild_crawl()
+        if isinstance(crawler, AsyncHttpGuildCrawler):
+            success = await crawler.run_guild_crawl_async()
+        else:
+            success = crawler.run_guild_crawl()
         
         if success:
             message = f"师门登录优化版测试成功！已提取数据到系统"
@@ -1078,22 +3427,22 @@ async def export_csv():
         df = pd.DataFrame(columns=["账号", "序号", "IP", "类型", "命名", "等级", "门派", "绝技", "当前次数", "总次数", "累计次数", "周期数", "总时间", "状态", "运行时间", "抓取时间"])
     else:
         df = pd.DataFrame([{
-            "账号": item["account_username"],
-            "序号": item["sequence_number"],
-            "IP": item["ip"],
-            "类型": item["type"],
-            "命名": item["name"],
-            "等级": item["level"],
-            "门派": item["guild"],
-            "绝技": item["skill"],
-            "当前次数": item["count_current"],
-            "总次数": item["count_total"],
-            "累计次数": item.get("accumulated_count", 0),
-            "周期数": item.get("cycle_count", 0),
-            "总时间": item["total_time"],
-            "状态": item["status"],
-            "运行时间": item["runtime"],
-            "抓取时间": item["crawl_timestamp"]
+            "账号": item.account_username,
+            "序号": item.sequence_number,
+            "IP": item.ip,
+            "类型": item.type,
+            "命名": item.name,
+            "等级": item.level,
+            "门派": item.guild,
+            "绝技": item.skill,
+            "当前次数": item.count_current,
+            "总次数": item.count_total,
+            "累计次数": item.accumulated_count,
+            "周期数": item.cycle_count,
+            "总时间": item.total_time,
+            "状态": item.status,
+            "运行时间": item.runtime,
+            "抓取时间": item.crawl_timestamp
         } for item in memory_data])
     
     output = io.StringIO()
@@ -1106,5 +3455,25 @@ async def export_csv():
         headers={"Content-Disposition": "attachment; filename=guild_crawler_v2.5_enhanced.csv"}
     )
 
+@app.on_event("startup")
+async def startup_event():
+    """启动时创建解析进程池、解析浏览器和驱动路径并开启内存巡检，避免在爬取过程中查找或下载驱动"""
+    config = CrawlerConfig()
+    if config.parse_in_process_pool:
+        # 在启动阶段创建解析进程池，不在爬取线程里临时创建
+        await asyncio.to_thread(get_parse_pool, config)
+    if config.crawl_engine == "selenium":
+        await asyncio.to_thread(resolve_chrome_runtime)
+        asyncio.create_task(memory_watchdog_task())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """服务关闭时释放所有浏览器资源"""
+    await asyncio.to_thread(driver_pool.shutdown)
+    await asyncio.to_thread(shared_browsers.shutdown)
+    close_http_sessions()
+    await close_async_http_clients()
+    shutdown_parse_pool()
+
 app.include_router(api_router)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
\ No newline at end of file
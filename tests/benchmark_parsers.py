@@ -0,0 +1,146 @@
+"""监控页解析基准测试 - 不启动浏览器，在语料页上测量解析、关键词检查和累计计算的吞吐与峰值内存
+
+用法:
+    python tests/benchmark_parsers.py
+    python tests/benchmark_parsers.py --sizes 100 1000 --repeat 5 --parsers lxml selectolax
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "backend"))
+sys.path.insert(0, ROOT_DIR)
+
+import server  # noqa: E402
+from tests.corpus.generate_corpus import CORPUS_SIZES, load_page  # noqa: E402
+
+TARGET_URL = server.CrawlerConfig().target_url
+
+
+def reset_state():
+    """清空跨周期的全局缓存，保证每次测量都是完整的冷启动解析"""
+    server.row_hashes.clear()
+    server.page_fingerprints.clear()
+    server.accumulated_data.clear()
+    server.keyword_stats.clear()
+    server.keyword_hit_windows.clear()
+    server.keyword_states.clear()
+
+
+def make_crawler(parser):
+    account = server.CrawlerAccount(username="BENCH", password="")
+    return server.OptimizedGuildCrawler(account, server.CrawlerConfig(html_parser=parser))
+
+
+def measure(func, repeat):
+    """返回(最快一次耗时秒数, 峰值内存字节数)"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def bench_size(size, parsers, repeat):
+    html = load_page(size)
+    results = []
+
+    def record(stage, parser, rows, seconds, peak):
+        results.append({
+            "size": size,
+            "stage": stage,
+            "parser": parser,
+            "rows_per_sec": int(rows / seconds) if seconds > 0 else 0,
+            "ms": round(seconds * 1000, 2),
+            "peak_kb": round(peak / 1024, 1)
+        })
+
+    # 1. HTML解析（extract_guild_data的表格提取部分）及各解析器结果一致性
+    reference = server.html_monitor_table(html, "html.parser", TARGET_URL)
+    for parser in parsers:
+        parsed = server.html_monitor_table(html, parser, TARGET_URL)
+        if parsed != reference:
+            raise AssertionError(f"{parser} 与 html.parser 的解析结果不一致 ({size} 行)")
+        seconds, peak = measure(lambda: server.html_monitor_table(html, parser, TARGET_URL), repeat)
+        record("parse_html", parser, len(reference[1]), seconds, peak)
+
+    header, rows = reference
+    crawler = make_crawler("html.parser")
+
+    # 2. 数据行转换（含关键词检查、累计计算和批量校验）- 冷启动
+    def build_cold():
+        reset_state()
+        crawler.build_guild_data(rows, header)
+    seconds, peak = measure(build_cold, repeat)
+    record("build_rows", "-", len(rows), seconds, peak)
+
+    # 3. 数据行转换 - 稳态（行哈希命中，只跳过未变化的行）
+    reset_state()
+    crawler.build_guild_data(rows, header)
+
+    def build_steady():
+        server.page_fingerprints.clear()
+        crawler.build_guild_data(rows, header)
+    seconds, peak = measure(build_steady, repeat)
+    record("build_rows_unchanged", "-", len(rows), seconds, peak)
+
+    # 4. 关键词检查 - 冷启动扫描，以及状态文本未变化时的跳过路径
+    status_index = server.column_indexes(header)[server.GUILD_COLUMNS.index("status")]
+    statuses = [(i, cells[status_index]) for i, cells in rows]
+
+    def keywords():
+        for i, text in statuses:
+            crawler.check_keywords(text, i)
+
+    def keywords_cold():
+        server.keyword_states.clear()
+        keywords()
+    seconds, peak = measure(keywords_cold, repeat)
+    record("check_keywords", "-", len(rows), seconds, peak)
+
+    seconds, peak = measure(keywords, repeat)
+    record("check_keywords_steady", "-", len(rows), seconds, peak)
+
+    # 5. 累计计算
+    count_index = server.column_indexes(header)[server.GUILD_COLUMNS.index("count")]
+    counts = [(i, server.to_counts(cells[count_index])) for i, cells in rows]
+
+    def accumulate():
+        for i, (current, total) in counts:
+            crawler.calculate_accumulated_data("BENCH", i, current, total)
+    seconds, peak = measure(accumulate, repeat)
+    record("accumulate", "-", len(rows), seconds, peak)
+
+    reset_state()
+    return results
+
+
+def main():
+    available = [name for name, backend in server.HTML_PARSER_BACKENDS.items() if backend]
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=CORPUS_SIZES)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--parsers", nargs="+", default=available)
+    args = arg_parser.parse_args()
+
+    # 关键词命中日志会淹没输出
+    logging.disable(logging.WARNING)
+
+    print(f"{'rows':>6}  {'stage':<22}{'parser':<13}{'rows/sec':>12}{'ms':>10}{'peak KB':>11}")
+    for size in args.sizes:
+        for r in bench_size(size, args.parsers, args.repeat):
+            print(f"{r['size']:>6}  {r['stage']:<22}{r['parser']:<13}{r['rows_per_sec']:>12}{r['ms']:>10}{r['peak_kb']:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""生成x8login监控页的合成语料（10/100/1000/10000行），用于离线解析基准测试
+
+用法: python tests/corpus/generate_corpus.py
+"""
+import gzip
+import os
+import random
+
+CORPUS_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_SIZES = [10, 100, 1000, 10000]
+
+HEADER = ["序号", "IP", "类型", "命名", "等级", "门派", "绝技", "次数", "总时间", "状态", "运行时间"]
+TYPES = ["鬼砍", "剑客", "杀手", "跑商"]
+GUILDS = ["青帮", "无门派", "九雷剑", "五毒", "天龙寺", "普陀山", "方寸山"]
+STATUSES = ["在线", "离线", "修炼中", "跑商中", "没钱了", "人脸提示", "网络异常", "连接超时", "掉线"]
+
+
+def corpus_path(size):
+    return os.path.join(CORPUS_DIR, f"monitor_{size}.html.gz")
+
+
+def render_page(size, seed=None):
+    """渲染一页监控页：登录后的导航表格 + 监控表，单元格带有空白和内嵌标签"""
+    rng = random.Random(size if seed is None else seed)
+    rows = []
+    for i in range(1, size + 1):
+        status = rng.choice(STATUSES)
+        cells = [
+            str(i),
+            f"222.210.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+            rng.choice(TYPES),
+            f"<span class=\"name\">师门角色{i}</span>",
+            str(rng.randint(60, 129)),
+            rng.choice(GUILDS),
+            str(rng.randint(0, 3)),
+            f"{rng.randint(0, 199)}/199",
+            f"{rng.randint(1, 12)}/199",
+            f"<font color=\"red\"> {status} </font>" if status not in ("在线", "修炼中") else status,
+            f"{rng.randint(0, 47):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}"
+        ]
+        rows.append("<tr>" + "".join(f"<td>\n  {cell}\n</td>" for cell in cells) + "</tr>")
+
+    header = "<tr>" + "".join(f"<th>{h}</th>" for h in HEADER) + "</tr>"
+    return (
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>后台管理 - 师门监控</title>"
+        "<link rel=\"stylesheet\" href=\"/static/app.css\"></head><body>"
+        "<table class=\"nav\"><tr><td><a href=\"/monitor\">监控</a></td><td><a href=\"/logout\">退出</a></td></tr></table>"
+        f"<div class=\"content\"><table class=\"table table-striped\"><thead>{header}</thead><tbody>"
+        + "\n".join(rows)
+        + "</tbody></table></div><script src=\"/static/app.js\"></script></body></html>"
+    )
+
+
+def load_page(size):
+    """读取语料页，缺失时现场生成"""
+    path = corpus_path(size)
+    if not os.path.exists(path):
+        return render_page(size)
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return f.read()
+
+
+def main():
+    for size in CORPUS_SIZES:
+        path = corpus_path(size)
+        # mtime=0保证重复生成的文件内容一致
+        with open(path, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+            f.write(render_page(size).encode("utf-8"))
+        print(f"{path}: {size} 行, {os.path.getsize(path)} 字节")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""各HTML解析后端与html.parser的监控表提取结果一致性测试"""
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "backend"))
+
+import server  # noqa: E402
+from tests.corpus.generate_corpus import CORPUS_SIZES, HEADER, load_page  # noqa: E402
+
+TARGET_URL = server.CrawlerConfig().target_url
+PARSERS = [name for name, backend in server.HTML_PARSER_BACKENDS.items() if backend and name != "html.parser"]
+
+# 单元格里的注释、&nbsp;、<br>和多层嵌套标签
+EDGE_CASE_CELLS = [
+    ["1", "222.210.79.115", "鬼砍", "<b><i>师门</i>角色1</b>", "100", "青帮", "0", "3/199", "1/199",
+     "没<!-- 注释 -->钱了", "01:02:03"],
+    ["2", "222.210.79.116", "剑客", "师门&nbsp;角色2", "&nbsp;99&nbsp;", "五毒", "1", "4/199", "2/199",
+     "网络<br>异常", "00:00:10"],
+    ["3", "222.210.79.117", "杀手", "<span><span><a href=\"#\">角色3</a></span></span>", "80", "无门派", "2",
+     "5/199", "3/199", "<font color=\"red\"> 掉线 <!-- x --> </font><br/>", "12:00:00"],
+    ["4", "222.210.79.118", "跑商", "", "<!-- 空 -->", "天龙寺", "3", "&nbsp;", "4/199",
+     "<p>连接</p><p>超时</p>", "23:59:59"],
+]
+
+
+def edge_case_page():
+    header = "<tr>" + "".join(f"<th>{h}</th>" for h in HEADER) + "</tr>"
+    rows = "".join("<tr>" + "".join(f"<td> {cell} </td>" for cell in cells) + "</tr>" for cells in EDGE_CASE_CELLS)
+    return (
+        "<html><body><table class=\"nav\"><tr><td>监控</td></tr></table>"
+        f"<table><thead>{header}</thead><tbody>{rows}</tbody></table></body></html>"
+    )
+
+
+PAGES = [pytest.param(lambda size=size: load_page(size), id=f"corpus_{size}") for size in CORPUS_SIZES]
+PAGES.append(pytest.param(edge_case_page, id="edge_cases"))
+
+
+@pytest.mark.skipif(not PARSERS, reason="未安装lxml或selectolax")
+@pytest.mark.parametrize("parser", PARSERS)
+@pytest.mark.parametrize("page", PAGES)
+def test_parser_matches_html_parser(page, parser):
+    html = page()
+    expected = server.html_monitor_table(html, "html.parser", TARGET_URL)
+    assert expected[1], "参考解析未取到数据行"
+    assert server.html_monitor_table(html, parser, TARGET_URL) == expected
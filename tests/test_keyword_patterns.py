@@ -0,0 +1,91 @@
+"""模式关键词校验与关键词匹配器测试"""
+import os
+import sys
+import time
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "backend"))
+
+import server  # noqa: E402
+
+# 会导致灾难性回溯的模式
+CATASTROPHIC_PATTERNS = [
+    "re:a*a*a*a*a*a*a*a*a*a*b",
+    "re:(.*)(.*)(.*)(.*)(.*)(.*)(.*)(.*)x",
+    "re:(a{1,20}){1,20}b",
+    "re:(a+)+b",
+    "re:(a|aa)*b",
+    "re:.*a.*b",
+    "glob:a*b*c",
+]
+
+ACCEPTED_PATTERNS = [
+    "re:连接超时|超时\\d+",
+    "re:掉线.*重连",
+    "re:(?:网络|连接)异常",
+    "glob:*掉线*重连*",
+    "glob:*?*?*?*?*?*?*?*?*?*?x",
+    "glob:师门?角色",
+]
+
+ADVERSARIAL_TEXTS = ["a" * server.KEYWORD_PATTERN_MAX_TEXT, "掉线" * (server.KEYWORD_PATTERN_MAX_TEXT // 2)]
+
+
+@pytest.mark.parametrize("keyword", CATASTROPHIC_PATTERNS)
+def test_rejects_catastrophic_patterns(keyword):
+    with pytest.raises(ValueError, match="回溯"):
+        server.validate_new_keyword(keyword, [])
+
+
+@pytest.mark.parametrize("keyword", ACCEPTED_PATTERNS)
+def test_accepted_patterns_search_quickly(keyword):
+    server.validate_new_keyword(keyword, [])
+    matcher = server.KeywordMatcher([keyword])
+    for text in ADVERSARIAL_TEXTS:
+        started = time.perf_counter()
+        matcher.find(text)
+        matcher.find(text + "x" * 10000)
+        assert time.perf_counter() - started < 0.5
+
+
+@pytest.mark.parametrize("keyword,reason", [
+    ("re:(?i)timeout", "全局内联标志"),
+    ("re:(?P<name>超时)", "命名分组"),
+    ("re:(超时)\\1", "反向引用"),
+    ("re:a*", "空文本"),
+    ("re:(", "无效的正则表达式"),
+    ("glob:*", "不能为空"),
+    ("re:" + "a" * server.KEYWORD_PATTERN_MAX_LENGTH, "过长"),
+])
+def test_rejects_invalid_patterns(keyword, reason):
+    with pytest.raises(ValueError, match=reason):
+        server.validate_new_keyword(keyword, [])
+
+
+@pytest.mark.parametrize("keyword", ["服务器错误(500)", "v1.0", "a*b", "glob", "re"])
+def test_literals_are_not_patterns(keyword):
+    assert server.keyword_kind(keyword) == "literal"
+    server.validate_new_keyword(keyword, [])
+    assert server.KeywordMatcher([keyword]).find(f"前缀{keyword}后缀") == [keyword]
+
+
+def test_wildcard_runs_are_merged():
+    assert server.wildcard_to_regex("*?*?掉线**重连?*") == ".{2}掉线.*重连."
+    assert server.wildcard_to_regex("师门??角色") == "师门.{2}角色"
+
+
+def test_matcher_finds_literals_and_patterns():
+    matcher = server.KeywordMatcher(["掉线", "超时", "re:错误\\d+", "glob:师门?角色", "re:(a+)+b"])
+    assert "re:(a+)+b" in matcher.rejected
+    assert matcher.find("网络超时后掉线，错误404") == ["超时", "掉线", "re:错误\\d+"]
+    assert matcher.find("师门1角色") == ["glob:师门?角色"]
+    assert matcher.find("正常") == []
+
+
+def test_patterns_only_match_text_prefix():
+    matcher = server.KeywordMatcher(["掉线", "re:错误\\d+"])
+    text = "正" * server.KEYWORD_PATTERN_MAX_TEXT + "掉线，错误404"
+    assert matcher.find(text) == ["掉线"]
+    assert server.keyword_predicate("re:错误\\d+")(text) is False